@@ -4,6 +4,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from app.config import settings
+from app.core.caches import user_cache, snapshot_row, restore_row
 from app.db.session import get_db_session
 from app.db.models.user import User
 from app.schemas.token import TokenData
@@ -19,8 +20,8 @@ async def get_current_tenant(request: Request):
     return tenant
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db_session)) -> User:
-    """Get the current user from the token"""
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db_session)) -> User:
+    """Get the current user from the token (active users are cached by username; ?nocache=1 bypasses the cache for admins)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,10 +37,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username, User.is_active == True).first()
+    # Admin tools may pass ?nocache=1 to force a fresh lookup; it is ignored for everyone else
+    values = user_cache.get(token_data.username)
+    if values is not None and not (request.query_params.get("nocache") and (values["is_admin"] or values["is_superadmin"])):
+        return restore_row(User, values)
+
+    user = db.query(User).filter(User.username == token_data.username, User.is_active).first()
     if user is None:
         raise credentials_exception
 
+    user_cache.set(user.username, snapshot_row(user))
     return user
 
 
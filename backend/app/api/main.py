@@ -2,15 +2,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from app.config import settings
 from app.api.middleware.tenant import TenantMiddleware
+from app.api.responses import AppORJSONResponse
 from app.api.routers import auth, users, tenants, symbols, config, system, eod_data, watchlist, feature_data, predictions, models, analytics
 from app.websockets.router import router as websocket_router
+from app.websockets.connection_manager import connection_manager
 from app.db.base import Base
 from app.db.session import engine
 from app.core.logger import get_logger
+from app.core.event_loop import set_main_loop, start_notification_worker, stop_notification_worker
 
 logger = get_logger(__name__)
 
@@ -22,6 +27,17 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize features, connections
     logger.info(f"Starting {settings.APP_NAME} API Server")
 
+    # Let background worker threads schedule WebSocket notifications on this loop
+    loop = asyncio.get_running_loop()
+    set_main_loop(loop)
+    start_notification_worker()
+
+    # One heartbeat monitor for all WebSocket connections
+    await connection_manager.start_heartbeat_monitor()
+
+    # Size the default executor used for blocking pipeline steps explicitly instead of min(32, cpu_count + 4)
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=settings.THREAD_POOL_SIZE, thread_name_prefix="asyncio-io"))
+
     # Check if system is initialized
     from app.db.session import SessionLocal
     from app.db.models.user import User
@@ -41,10 +57,12 @@ async def lifespan(app: FastAPI):
 
     # Shutdown code
     logger.info(f"Shutting down {settings.APP_NAME} API Server")
+    await connection_manager.stop_heartbeat_monitor()
+    await stop_notification_worker()
 
 
 # Initialize FastAPI app with lifespan
-app = FastAPI(title=settings.APP_NAME, description="Multi-tenant Stock Market Intelligence API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(title=settings.APP_NAME, description="Multi-tenant Stock Market Intelligence API", version="1.0.0", lifespan=lifespan, default_response_class=AppORJSONResponse)
 
 # Adding CORS middleware
 app.add_middleware(CORSMiddleware, allow_origins=settings.CORS_ORIGINS, allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["Content-Type", "Authorization", settings.TENANT_HEADER_NAME], max_age=86400)
@@ -75,8 +93,12 @@ async def root():
     return {"status": "online", "api_version": "1.0.0", "system_name": settings.APP_NAME, "documentation": "/docs"}
 
 
-# Run the application with: uvicorn app.main:app --reload
+# Run the application with:
+#   uvicorn app.main:app --reload --ws-per-message-deflate false --ws-ping-interval 30 --ws-ping-timeout 60
+# Large broadcasts are compressed once by the connection manager; per-connection deflate would redo it for every client.
+# Protocol-level pings detect dead WebSocket peers, so the endpoints don't run their own receive timeouts.
+# Any launch (CLI, process manager, container) must pass these WebSocket settings; the block below mirrors them.
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True, ws_per_message_deflate=False, ws_ping_interval=30.0, ws_ping_timeout=60.0)
@@ -1,7 +1,9 @@
 # backend/app/api/middleware/tenant.py
 from fastapi import Request, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
-from app.db.session import get_db_session
+from app.core.caches import tenant_cache, snapshot_row, restore_row
+from app.db.models.tenant import Tenant
+from app.db.session import SessionLocal
 
 
 class TenantMiddleware(BaseHTTPMiddleware):
@@ -13,15 +15,23 @@ class TenantMiddleware(BaseHTTPMiddleware):
         if not tenant_id:
             return await call_next(request)
 
-        # Store tenant in request state
-        session = next(get_db_session())
-        from app.db.models.tenant import Tenant
+        # Active tenants are cached by slug
+        values = tenant_cache.get(tenant_id)
+
+        if values is None:
+            session = SessionLocal()
+            try:
+                tenant = session.query(Tenant).filter(Tenant.slug == tenant_id, Tenant.is_active).first()
+                values = snapshot_row(tenant) if tenant else None
+            finally:
+                session.close()
 
-        tenant = session.query(Tenant).filter(Tenant.slug == tenant_id, Tenant.is_active == True).first()
+            if values is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found or inactive")
 
-        if not tenant:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found or inactive")
+            tenant_cache.set(tenant_id, values)
 
-        request.state.tenant = tenant
+        # Store tenant in request state
+        request.state.tenant = restore_row(Tenant, values)
         response = await call_next(request)
         return response
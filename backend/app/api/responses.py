@@ -0,0 +1,13 @@
+# backend/app/api/responses.py
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+
+from app.utils.json_utils import encode_message
+
+
+class AppORJSONResponse(ORJSONResponse):
+    """Default API response, rendered with orjson using the app's options (numpy, non-str keys, Decimal)"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_message(content)
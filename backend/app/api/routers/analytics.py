@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, Query
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
+from sqlalchemy import func
 
 from app.db.session import get_db_session
 from app.db.models.prediction import Prediction
@@ -11,14 +11,16 @@ from app.db.models.symbol import Symbol
 from app.schemas.analytics import DashboardSummary, SymbolPerformance, PredictionTrend, TimeframeEnum, PerformanceMetric
 from app.api.deps import get_current_tenant, get_current_user
 from app.websockets.connection_manager import connection_manager
-import asyncio
+from app.core.event_loop import enqueue_notification
+from app.utils.json_utils import encode_message
 
 router = APIRouter()
 
 
 async def notify_dashboard_update(tenant_id: int, update_type: str, data: Dict[str, Any]):
     """Send dashboard updates via WebSocket"""
-    message = {"type": "dashboard_update", "timestamp": datetime.now().isoformat(), "update_type": update_type, "data": data, "tenant_id": tenant_id}
+    # Encode once for both the topic and the tenant broadcast
+    message = encode_message({"type": "dashboard_update", "timestamp": datetime.now().isoformat(), "update_type": update_type, "data": data, "tenant_id": tenant_id})
 
     # Broadcast to dashboard topic
     await connection_manager.broadcast(message, "dashboard")
@@ -68,7 +70,7 @@ async def get_dashboard_summary(timeframe: TimeframeEnum = Query(TimeframeEnum.M
     symbol_performance = []
     if start_date:
         # Subquery to get predictions per symbol
-        symbol_data = db.query(Prediction.symbol_id, func.count(Prediction.id).label("total"), func.sum(func.cast(Prediction.verified == True, Integer)).label("correct")).filter(Prediction.tenant_id == tenant.id, Prediction.date >= start_date).group_by(Prediction.symbol_id).having(func.count(Prediction.id) >= 5).subquery()
+        symbol_data = db.query(Prediction.symbol_id, func.count(Prediction.id).label("total"), func.count(Prediction.id).filter(Prediction.verified == True).label("correct")).filter(Prediction.tenant_id == tenant.id, Prediction.date >= start_date).group_by(Prediction.symbol_id).having(func.count(Prediction.id) >= 5).subquery()
 
         # Join with symbols to get names
         symbols_with_performance = db.query(Symbol.id, Symbol.name, symbol_data.c.total, symbol_data.c.correct).join(symbol_data, Symbol.id == symbol_data.c.symbol_id).filter(Symbol.tenant_id == tenant.id).all()
@@ -92,7 +94,7 @@ async def get_dashboard_summary(timeframe: TimeframeEnum = Query(TimeframeEnum.M
         trend_start = today - timedelta(days=trend_days - 1)
 
         # Get daily counts
-        daily_data = db.query(Prediction.date, func.count(Prediction.id).label("total"), func.sum(func.cast(Prediction.verified == True, Integer)).label("correct")).filter(Prediction.tenant_id == tenant.id, Prediction.date >= trend_start).group_by(Prediction.date).order_by(Prediction.date).all()
+        daily_data = db.query(Prediction.date, func.count(Prediction.id).label("total"), func.count(Prediction.id).filter(Prediction.verified == True).label("correct")).filter(Prediction.tenant_id == tenant.id, Prediction.date >= trend_start).group_by(Prediction.date).order_by(Prediction.date).all()
 
         # Format trend data
         for day in daily_data:
@@ -102,7 +104,7 @@ async def get_dashboard_summary(timeframe: TimeframeEnum = Query(TimeframeEnum.M
     dashboard_data = DashboardSummary(current_date=today, total_active_symbols=active_symbols, total_predictions=total_predictions, verified_predictions=verified_predictions, overall_accuracy=verified_predictions / total_predictions if total_predictions > 0 else 0, recent_predictions=recent_predictions, recent_accuracy=recent_verified / recent_predictions if recent_predictions > 0 else 0, top_performing_symbols=symbol_performance, prediction_trends=trends)
 
     # Send WebSocket notification
-    asyncio.create_task(notify_dashboard_update(tenant.id, "dashboard_refresh", dashboard_data.dict()))
+    enqueue_notification(notify_dashboard_update(tenant.id, "dashboard_refresh", dashboard_data.dict()))
 
     return dashboard_data
 
@@ -5,10 +5,10 @@ from datetime import date
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db_session
-from app.db.models.prediction import Prediction, DirectionEnum
 from app.db.models.symbol import Symbol
 from app.schemas.prediction import PredictionResponse, PredictionList, PredictionFilter, PredictionStats, PredictionRequest
-from app.services.prediction_service import get_latest_prediction, get_predictions_by_date, verify_predictions
+from app.services.prediction_service import get_latest_prediction, get_predictions_by_date, verify_predictions, prediction_task_status, predict_for_tenant_with_notifications
+from app.services.prediction_service import get_prediction_stats as compute_prediction_stats
 from app.core.predict.daily_predictor import predict_for_tenant
 from app.api.deps import get_current_tenant, get_current_user, get_current_active_admin
 import uuid
@@ -54,33 +54,7 @@ async def list_predictions(date: Optional[date] = Query(None, description="Filte
 @router.get("/stats", response_model=PredictionStats)
 async def get_prediction_stats(start_date: Optional[date] = Query(None, description="Start date for stats period"), end_date: Optional[date] = Query(None, description="End date for stats period"), symbol_id: Optional[int] = Query(None, description="Filter by symbol ID"), db: Session = Depends(get_db_session), tenant=Depends(get_current_tenant), current_user=Depends(get_current_user)):
     """Get prediction accuracy statistics"""
-    query = db.query(Prediction).filter(Prediction.tenant_id == tenant.id)
-
-    if start_date:
-        query = query.filter(Prediction.date >= start_date)
-
-    if end_date:
-        query = query.filter(Prediction.date <= end_date)
-
-    if symbol_id:
-        query = query.filter(Prediction.symbol_id == symbol_id)
-
-    predictions = query.all()
-
-    # Calculate statistics
-    total_count = len(predictions)
-    verified_count = sum(1 for p in predictions if p.verified)
-    up_count = sum(1 for p in predictions if p.direction_prediction == DirectionEnum.UP)
-    down_count = sum(1 for p in predictions if p.direction_prediction == DirectionEnum.DOWN)
-
-    # Direction accuracy
-    direction_predictions = [p for p in predictions if p.verified and p.direction_prediction and p.actual_direction]
-    direction_correct = sum(1 for p in direction_predictions if p.direction_prediction == p.actual_direction)
-
-    # Days to fulfill
-    days_to_fulfill = [p.days_to_fulfill for p in predictions if p.verified and p.days_to_fulfill]
-
-    return PredictionStats(total_predictions=total_count, verified_predictions=verified_count, accuracy=verified_count / total_count if total_count > 0 else 0.0, up_predictions=up_count, down_predictions=down_count, direction_accuracy=direction_correct / len(direction_predictions) if direction_predictions else None, avg_days_to_fulfill=sum(days_to_fulfill) / len(days_to_fulfill) if days_to_fulfill else None)
+    return PredictionStats(**compute_prediction_stats(db, tenant.id, symbol_id=symbol_id, start_date=start_date, end_date=end_date))
 
 
 @router.post("/verify", status_code=status.HTTP_200_OK)
@@ -98,13 +72,8 @@ async def generate_predictions(background_tasks: BackgroundTasks, request: Optio
     task_id = str(uuid.uuid4())
 
     # Store initial status in a global variable
-    from app.services.prediction_service import prediction_task_status
-
     prediction_task_status[task_id] = {"status": "started", "started_at": datetime.now().isoformat(), "tenant_id": tenant.id, "user_id": current_user.id, "symbols": request.symbols if request and request.symbols else "all_watchlist"}
 
-    # Import the wrapper function
-    from app.services.prediction_service import predict_for_tenant_with_notifications
-
     # Start task in background
     background_tasks.add_task(predict_for_tenant_with_notifications, tenant.id, request, current_user, task_id)
 
@@ -19,10 +19,14 @@ symbol_import_status = {}
 
 # Symbol Access (All Users)
 @router.get("", response_model=SymbolList)
-async def list_symbols(active_only: bool = Query(True, description="Only show active symbols"), fo_eligible: Optional[bool] = Query(None, description="Filter by F&O eligibility"), skip: int = Query(0, description="Number of records to skip"), limit: int = Query(None, description="Maximum number of records to return"), db: Session = Depends(get_db_session), current_user=Depends(get_current_user)):
+async def list_symbols(active_only: bool = Query(True, description="Only show active symbols"), fo_eligible: Optional[bool] = Query(None, description="Filter by F&O eligibility"), cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"), limit: int = Query(None, description="Maximum number of records to return"), db: Session = Depends(get_db_session), current_user=Depends(get_current_user)):
     """List all symbols with filtering options"""
-    symbols = get_symbols(db, active_only, fo_eligible, skip, limit)
-    return SymbolList(symbols=symbols, count=len(symbols))
+    try:
+        symbols, next_cursor = get_symbols(db, active_only, fo_eligible, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return SymbolList(symbols=symbols, count=len(symbols), next_cursor=next_cursor)
 
 
 @router.get("/{symbol_id}", response_model=SymbolResponse)
@@ -45,7 +49,7 @@ async def search_symbols_endpoint(query: str = Query(..., description="Search te
 @router.get("/admin/all", response_model=SymbolList)
 async def admin_list_symbols(active_only: bool = Query(False, description="Filter by active status"), db: Session = Depends(get_db_session), current_superadmin=Depends(get_current_superadmin)):
     """Admin view of all symbols (superadmin only)"""
-    symbols = get_symbols(db, active_only)
+    symbols, _ = get_symbols(db, active_only)
     return SymbolList(symbols=symbols, count=len(symbols))
 
 
@@ -67,16 +71,17 @@ async def import_symbols_endpoint(background_tasks: BackgroundTasks, force_downl
 @router.get("/admin/import/status/{task_id}", response_model=Dict[str, Any])
 async def get_import_status(task_id: str = Path(..., description="Import task ID"), current_superadmin=Depends(get_current_superadmin)):
     """Get the status of a symbol import task (superadmin only)"""
-    if task_id not in symbol_import_status:
+    status_data = symbol_import_status.get(task_id)
+    if status_data is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import task not found")
 
-    return symbol_import_status[task_id]
+    return status_data
 
 
 @router.get("/admin/stats", response_model=SymbolStatsResponse)
-async def get_symbol_statistics(db: Session = Depends(get_db_session), current_superadmin=Depends(get_current_superadmin)):
+async def get_symbol_statistics(current_superadmin=Depends(get_current_superadmin)):
     """Get system-wide symbol statistics (superadmin only)"""
-    stats = get_symbols_with_stats(db)
+    stats = await get_symbols_with_stats()
     return stats
 
 
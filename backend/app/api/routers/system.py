@@ -1,5 +1,6 @@
 # backend/app/api/routers/system.py (updated with pipeline integration)
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+import asyncio
 from typing import Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
@@ -36,7 +37,7 @@ async def get_system_status(db: Session = Depends(get_db_session), tenant=Depend
 async def trigger_pipeline(background_tasks: BackgroundTasks, request: PipelineRunRequest = PipelineRunRequest(), db: Session = Depends(get_db_session), tenant=Depends(get_current_tenant), current_user=Depends(get_current_active_admin)):
     """Trigger a run of the data pipeline for this tenant"""
     # Get current pipeline status
-    status = get_pipeline_status(tenant.id)
+    status = await asyncio.to_thread(get_pipeline_status, tenant.id)
 
     # If pipeline is already running and not forced, return status
     if status["status"] == "running" and not request.force:
@@ -51,7 +52,7 @@ async def trigger_pipeline(background_tasks: BackgroundTasks, request: PipelineR
 @router.get("/pipeline-status", response_model=Dict[str, Any])
 async def get_pipeline_current_status(db: Session = Depends(get_db_session), tenant=Depends(get_current_tenant), current_user=Depends(get_current_user)):
     """Get current pipeline status"""
-    return get_pipeline_status(tenant.id)
+    return await asyncio.to_thread(get_pipeline_status, tenant.id)
 
 
 # Add this to routers/system.py or create a new admin router
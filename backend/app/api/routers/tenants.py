@@ -1,7 +1,7 @@
 # backend/app/api/routers/tenants.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.session import get_db_session
 from app.schemas.tenant import TenantCreate, TenantUpdate, TenantResponse
 from app.services.tenant_service import create_tenant, get_tenant, get_tenants, update_tenant, delete_tenant
@@ -17,9 +17,9 @@ def create_new_tenant(tenant: TenantCreate, db: Session = Depends(get_db_session
 
 
 @router.get("", response_model=List[TenantResponse])
-def read_tenants(skip: int = 0, limit: int = 100, db: Session = Depends(get_db_session), current_user=Depends(get_current_superadmin)):  # Only superadmins can list all tenants
-    """Get all tenants"""
-    return get_tenants(db, skip, limit)
+def read_tenants(after_id: Optional[int] = None, limit: int = 100, db: Session = Depends(get_db_session), current_user=Depends(get_current_superadmin)):  # Only superadmins can list all tenants
+    """Get all tenants (pass the last tenant ID as after_id for the next page)"""
+    return get_tenants(db, after_id, limit)
 
 
 @router.get("/{tenant_id}", response_model=TenantResponse)
@@ -1,7 +1,7 @@
 # backend/app/api/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.session import get_db_session
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 from app.services.user_service import create_user, get_user, get_users_by_tenant, update_user
@@ -19,9 +19,9 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db_session), cur
 
 
 @router.get("/", response_model=List[UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db_session), current_user=Depends(get_current_active_admin), tenant=Depends(get_current_tenant)):
-    """Get all users in the current tenant"""
-    return get_users_by_tenant(db, tenant.id, skip, limit)
+def read_users(after_id: Optional[int] = None, limit: int = 100, db: Session = Depends(get_db_session), current_user=Depends(get_current_active_admin), tenant=Depends(get_current_tenant)):
+    """Get all users in the current tenant (pass the last user ID as after_id for the next page)"""
+    return get_users_by_tenant(db, tenant.id, after_id, limit)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -0,0 +1,70 @@
+# app/core/caches.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Type, TypeVar
+
+from sqlalchemy import inspect
+
+T = TypeVar("T")
+
+# Hot per-request lookups (tenant by slug in the tenant middleware, user by username in auth)
+LOOKUP_CACHE_TTL = 60  # seconds
+LOOKUP_CACHE_MAX_SIZE = 1024
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache a value (for ttl seconds if given, else the cache's ttl), evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Drop a cached value if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all cached values"""
+        with self._lock:
+            self._data.clear()
+
+
+# Keyed by tenant slug and by username respectively
+tenant_cache = TTLCache(LOOKUP_CACHE_MAX_SIZE, LOOKUP_CACHE_TTL)
+user_cache = TTLCache(LOOKUP_CACHE_MAX_SIZE, LOOKUP_CACHE_TTL)
+
+
+def snapshot_row(instance: Any) -> Dict[str, Any]:
+    """Copy the column values of an ORM instance into a plain dict"""
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
+
+
+def restore_row(model: Type[T], values: Dict[str, Any]) -> T:
+    """Build a transient (session-less) model instance from a snapshot_row dict"""
+    return model(**values)
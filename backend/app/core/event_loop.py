@@ -0,0 +1,124 @@
+# app/core/event_loop.py
+
+import asyncio
+from concurrent.futures import Future
+from typing import Coroutine, Optional, Union
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# The server's event loop, captured at startup so worker threads can schedule notifications on it
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Bounded queue of pending notification coroutines, drained by a single consumer on the main loop
+NOTIFY_QUEUE_MAX_SIZE = 10_000
+_notify_queue: Optional[asyncio.Queue] = None
+_notify_worker_task: Optional[asyncio.Task] = None
+
+
+def set_main_loop(loop: asyncio.AbstractEventLoop):
+    """Remember the application's main event loop"""
+    global _main_loop
+    _main_loop = loop
+
+
+def get_main_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Get the application's main event loop, if captured"""
+    return _main_loop
+
+
+def schedule_coroutine(coro: Coroutine) -> Optional[Union[asyncio.Task, Future]]:
+    """
+    Schedule a coroutine from either async or sync (worker thread) code.
+
+    Inside a running loop this is create_task; from other threads the coroutine
+    is submitted to the main loop with run_coroutine_threadsafe. If no loop is
+    available the coroutine is dropped.
+    """
+    try:
+        return asyncio.get_running_loop().create_task(coro)
+    except RuntimeError:
+        pass
+
+    if _main_loop is not None and _main_loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coro, _main_loop)
+
+    logger.debug("No running event loop, dropping scheduled notification")
+    coro.close()
+    return None
+
+
+async def _notify_worker():
+    """Await queued notifications one at a time, logging failures"""
+    while True:
+        coro = await _notify_queue.get()
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"Notification failed: {e}")
+        finally:
+            _notify_queue.task_done()
+
+
+def start_notification_worker():
+    """Create the notification queue and its consumer on the running loop"""
+    global _notify_queue, _notify_worker_task
+    _notify_queue = asyncio.Queue(maxsize=NOTIFY_QUEUE_MAX_SIZE)
+    _notify_worker_task = asyncio.get_running_loop().create_task(_notify_worker())
+
+
+async def stop_notification_worker():
+    """Stop the notification consumer, dropping anything still queued"""
+    global _notify_queue, _notify_worker_task
+    if _notify_worker_task is None:
+        return
+
+    _notify_worker_task.cancel()
+    try:
+        await _notify_worker_task
+    except asyncio.CancelledError:
+        pass
+
+    while not _notify_queue.empty():
+        _notify_queue.get_nowait().close()
+
+    _notify_queue, _notify_worker_task = None, None
+
+
+def _put_notification(coro: Coroutine):
+    if _notify_queue is None:
+        coro.close()
+        return
+
+    try:
+        _notify_queue.put_nowait(coro)
+    except asyncio.QueueFull:
+        logger.warning("Notification queue full, dropping notification")
+        coro.close()
+
+
+def enqueue_notification(coro: Coroutine):
+    """
+    Queue a notification coroutine for the single consumer on the main loop.
+
+    Safe to call from the loop or from worker threads. Falls back to
+    schedule_coroutine when the consumer has not been started.
+    """
+    if _notify_queue is None:
+        schedule_coroutine(coro)
+        return
+
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+
+    if running_loop is _main_loop:
+        _put_notification(coro)
+    elif _main_loop is not None and _main_loop.is_running():
+        # asyncio.Queue is not thread-safe; hand the coroutine to the main loop to enqueue
+        _main_loop.call_soon_threadsafe(_put_notification, coro)
+    else:
+        logger.debug("Main event loop not running, dropping notification")
+        coro.close()
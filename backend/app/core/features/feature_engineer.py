@@ -4,7 +4,7 @@ import pandas as pd
 import numpy as np
 import time
 from functools import lru_cache
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -88,8 +88,13 @@ def calculate_rsi(series, period=14):
     return pd.Series(rsi, index=series.index)
 
 
-def calculate_features(eod_df: pd.DataFrame, symbol: str = "Unknown") -> pd.DataFrame:
-    """Calculate features with optimized operations."""
+def calculate_features(eod_df: pd.DataFrame, symbol: str = "Unknown", tail_dates: Optional[Set] = None) -> pd.DataFrame:
+    """
+    Calculate features with optimized operations.
+
+    Rolling indicators are always computed over the whole frame (the lookback rows act as
+    warmup); when tail_dates is given only the rows for those dates are returned.
+    """
     start_time = time.time()
 
     # Sort data chronologically
@@ -186,6 +191,10 @@ def calculate_features(eod_df: pd.DataFrame, symbol: str = "Unknown") -> pd.Data
     elapsed = time.time() - start_time
     logger.info(f"Feature calculation completed for {symbol} in {elapsed:.2f} seconds for {len(df)} rows.")
 
+    if tail_dates is not None:
+        # Copy the slice so the warmup rows are not kept alive by the result
+        return df.loc[df["date"].isin(tail_dates), feature_columns].copy()
+
     return df[feature_columns]
 
 
@@ -1,5 +1,6 @@
 # backend/app/core/predict/daily_predictor.py
 
+from operator import itemgetter
 import os
 import joblib
 import pandas as pd
@@ -9,7 +10,8 @@ from functools import lru_cache
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import text
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.db.session import get_db_session, SessionLocal
 from app.db.models.prediction import Prediction
 from app.db.models.symbol import Symbol
@@ -139,12 +141,15 @@ def save_prediction(tenant_id: int, symbol_id: int, date, move_confidence: float
     """Save prediction to database with tenant isolation."""
     session = next(get_db_session())
     try:
-        # First delete existing prediction for same symbol, tenant and date
-        session.query(Prediction).filter(Prediction.tenant_id == tenant_id, Prediction.symbol_id == symbol_id, Prediction.date == date).delete()
-
-        # Create and add new prediction
-        prediction = Prediction(tenant_id=tenant_id, symbol_id=symbol_id, date=date, strong_move_confidence=move_confidence, direction_prediction=direction, direction_confidence=direction_confidence, model_config_hash=f"{tenant_id}_{datetime.now().strftime('%Y%m%d')}")  # Simple tracking
-        session.add(prediction)
+        # Replace any existing prediction for same symbol, tenant and date in a single statement
+        values = {"tenant_id": tenant_id, "symbol_id": symbol_id, "date": date, "strong_move_confidence": move_confidence, "direction_prediction": direction, "direction_confidence": direction_confidence, "model_config_hash": f"{tenant_id}_{datetime.now().strftime('%Y%m%d')}"}  # Simple tracking
+        stmt = pg_insert(Prediction).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_tenant_symbol_prediction_date",
+            # A fresh prediction starts unverified, as the old delete-and-insert did
+            set_={**{key: stmt.excluded[key] for key in values if key not in ("tenant_id", "symbol_id", "date")}, "verified": False, "verification_date": None, "actual_move_percent": None, "actual_direction": None, "days_to_fulfill": None, "created_at": func.now()},
+        )
+        session.execute(stmt)
         session.commit()
         return True
     except SQLAlchemyError as e:
@@ -266,7 +271,7 @@ def predict_for_tenant(tenant_id: int, request: Optional[PredictionRequest] = No
             else:
                 # Non-super admin can only use symbols that are in both request and their watchlist
                 watchlist = get_tenant_watchlist(session, tenant_id, active_only=True, fo_eligible=request.fo_eligible if request else True)
-                watchlist_ids = [item["symbol_id"] for item in watchlist]
+                watchlist_ids = set(map(itemgetter("symbol_id"), watchlist))
                 symbol_ids = [sid for sid in request.symbols if sid in watchlist_ids]
         else:
             # No specific symbols requested
@@ -282,7 +287,7 @@ def predict_for_tenant(tenant_id: int, request: Optional[PredictionRequest] = No
             else:
                 # Other users get their watchlist
                 watchlist = get_tenant_watchlist(session, tenant_id, active_only=True, fo_eligible=request.fo_eligible if request else True)
-                symbol_ids = [item["symbol_id"] for item in watchlist]
+                symbol_ids = list(map(itemgetter("symbol_id"), watchlist))
 
         # Get symbol names for better logging
         symbol_names = {s.id: s.trading_symbol for s in session.query(Symbol).filter(Symbol.id.in_(symbol_ids)).all()}
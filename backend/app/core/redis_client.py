@@ -0,0 +1,35 @@
+# app/core/redis_client.py
+
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.core.logger import get_logger
+
+try:
+    import redis
+except ImportError:  # Redis is optional; callers fall back to in-process state
+    redis = None
+
+logger = get_logger(__name__)
+
+# Raised by the client when Redis is unreachable or fails; callers catch it and fall back to in-process state
+RedisError = redis.RedisError if redis is not None else Exception
+
+
+@lru_cache
+def get_redis_client() -> Optional["redis.Redis"]:
+    """
+    Get the shared Redis client.
+
+    Returns None when REDIS_URL is not configured or the redis package is not
+    installed, in which case callers keep their state in process memory.
+    """
+    if not settings.REDIS_URL:
+        return None
+
+    if redis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using in-process state")
+        return None
+
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
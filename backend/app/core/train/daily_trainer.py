@@ -1,5 +1,6 @@
 # backend/app/core/train/daily_trainer.py
 
+from operator import itemgetter
 import os
 import pandas as pd
 import numpy as np
@@ -14,9 +15,12 @@ from app.db.models.symbol import Symbol
 from app.db.models.tenant import Tenant
 from app.db.models.user import User
 from app.db.models.model_performance import ModelPerformance
+from app.db.models.prediction_model import PredictionModel
 from app.core.config import get_model_path, get_model_params, LIGHTGBM, RANDOM_FOREST, XGBOOST
 from app.core.logger import get_logger
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from app.core.event_loop import enqueue_notification
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, mean_squared_error, mean_absolute_error, r2_score, roc_auc_score
+from sklearn.ensemble import RandomForestClassifier
 from app.services.config_service import get_tenant_config
 from app.services.symbol_service import get_tenant_watchlist
 from app.api.deps import get_current_user
@@ -24,7 +28,7 @@ from app.schemas.model import ModelRequest
 import multiprocessing
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.websockets.connection_manager import connection_manager
-import asyncio
+from app.utils.json_utils import encode_message
 import time
 
 logger = get_logger(__name__)
@@ -32,7 +36,8 @@ logger = get_logger(__name__)
 
 async def notify_model_training_status(tenant_id: int, task_id: str, status: str, details: Dict[str, Any] = None):
     """Send WebSocket notification about model training status"""
-    message = {"type": "model_training_status", "timestamp": datetime.now().isoformat(), "data": {"task_id": task_id, "status": status, **(details or {})}}
+    # Encode once for all three broadcasts
+    message = encode_message({"type": "model_training_status", "timestamp": datetime.now().isoformat(), "data": {"task_id": task_id, "status": status, **(details or {})}})
 
     # Broadcast to system topic (for admins)
     await connection_manager.broadcast(message, "system")
@@ -54,8 +59,6 @@ def get_classifier(classifier_name: str, tenant_id: int = None, db: Session = No
 
     try:
         if classifier_name == RANDOM_FOREST:
-            from sklearn.ensemble import RandomForestClassifier
-
             return RandomForestClassifier(**(params or {}))
 
         elif classifier_name == XGBOOST:
@@ -82,8 +85,6 @@ def get_classifier(classifier_name: str, tenant_id: int = None, db: Session = No
     except ImportError as e:
         logger.error(f"Library not available: {e}")
         # Fallback to Random Forest which is always available
-        from sklearn.ensemble import RandomForestClassifier
-
         return RandomForestClassifier()
 
 
@@ -186,8 +187,6 @@ def select_features(X: pd.DataFrame, y: pd.Series, max_features: int = 10) -> Li
         X_clean = X.select_dtypes(include=["number"]).fillna(0)
 
         # Use Random Forest for feature selection
-        from sklearn.ensemble import RandomForestClassifier
-
         model = RandomForestClassifier(n_estimators=50, random_state=42)
         model.fit(X_clean, y)
 
@@ -207,8 +206,6 @@ def record_model_performance(session: Session, tenant_id: int, symbol_id: int, m
         symbol_info = f"{symbol.trading_symbol} (ID: {symbol_id})" if symbol else f"ID: {symbol_id}"
 
         # Find or create model entry
-        from app.db.models.prediction_model import PredictionModel
-
         model = session.query(PredictionModel).filter(PredictionModel.tenant_id == tenant_id, PredictionModel.symbol_id == symbol_id, PredictionModel.model_type == model_type, PredictionModel.is_active == True).first()
 
         if not model:
@@ -332,17 +329,12 @@ def train_model_for_symbol(tenant_id: int, symbol_id: int, db: Session = None) -
         metrics = {"accuracy": accuracy_score(y_test, move_preds), "precision": precision_score(y_test, move_preds, zero_division=0), "recall": recall_score(y_test, move_preds, zero_division=0), "f1": f1_score(y_test, move_preds, zero_division=0), "y_test": y_test, "y_train": y_train, "training_time": move_train_duration, "params": move_model.get_params(), "config_hash": f"{tenant_id}_{symbol_id}_{model_type}_{datetime.now().strftime('%Y%m%d')}"}
 
         # Additional metrics if needed
-        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-
         try:
             move_probs = move_model.predict_proba(X_test)[:, 1]
             metrics["mse"] = mean_squared_error(y_test, move_probs)
             metrics["rmse"] = np.sqrt(metrics["mse"])
             metrics["mae"] = mean_absolute_error(y_test, move_probs)
             metrics["r2"] = r2_score(y_test, move_probs)
-
-            from sklearn.metrics import roc_auc_score
-
             metrics["roc_auc"] = roc_auc_score(y_test, move_probs)
         except Exception as e:
             logger.warning(f"Could not calculate additional metrics for {symbol_info}: {e}")
@@ -443,7 +435,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
     model_training_status[task_id] = {"status": "started", "started_at": datetime.now().isoformat(), "tenant_id": tenant_id, "total": 0, "processed": 0, "successful": 0, "failed": 0}
 
     # Initial status notification
-    asyncio.create_task(notify_model_training_status(tenant_id, task_id, "started", {"message": "Starting model training"}))
+    enqueue_notification(notify_model_training_status(tenant_id, task_id, "started", {"message": "Starting model training"}))
 
     try:
         # Get tenant info
@@ -456,7 +448,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
             model_training_status[task_id].update({"status": "failed", "error": "Tenant not found", "completed_at": datetime.now().isoformat()})
 
             # Send error notification
-            asyncio.create_task(notify_model_training_status(tenant_id, task_id, "failed", {"error": "Tenant not found"}))
+            enqueue_notification(notify_model_training_status(tenant_id, task_id, "failed", {"error": "Tenant not found"}))
 
             return results
 
@@ -468,7 +460,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
             else:
                 # Non-super admin can only use symbols that are in both request and their watchlist
                 watchlist = get_tenant_watchlist(session, tenant_id, active_only=True, fo_eligible=request.fo_eligible if request else True)
-                watchlist_ids = [item["symbol_id"] for item in watchlist]
+                watchlist_ids = set(map(itemgetter("symbol_id"), watchlist))
                 symbol_ids = [sid for sid in request.symbols if sid in watchlist_ids]
         else:
             # No specific symbols requested
@@ -484,7 +476,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
             else:
                 # Other users get their watchlist
                 watchlist = get_tenant_watchlist(session, tenant_id, active_only=True, fo_eligible=request.fo_eligible if request else True)
-                symbol_ids = [item["symbol_id"] for item in watchlist]
+                symbol_ids = list(map(itemgetter("symbol_id"), watchlist))
 
         # Get symbol names for better logging
         symbol_names = {s.id: s.trading_symbol for s in session.query(Symbol).filter(Symbol.id.in_(symbol_ids)).all()}
@@ -493,7 +485,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
         model_training_status[task_id]["total"] = len(symbol_ids)
 
         # Send update with total count
-        asyncio.create_task(notify_model_training_status(tenant_id, task_id, "progress", {"total": len(symbol_ids), "message": f"Training {len(symbol_ids)} models"}))
+        enqueue_notification(notify_model_training_status(tenant_id, task_id, "progress", {"total": len(symbol_ids), "message": f"Training {len(symbol_ids)} models"}))
 
         logger.info(f"Training models for tenant {tenant_id}: {len(symbol_ids)} symbols")
 
@@ -519,7 +511,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
                 # Send progress update
                 if processed % 5 == 0 or processed == len(symbol_ids):
                     progress = (processed / len(symbol_ids)) * 100
-                    asyncio.create_task(notify_model_training_status(tenant_id, task_id, "progress", {"processed": processed, "total": len(symbol_ids), "successful": model_training_status[task_id]["successful"], "failed": model_training_status[task_id]["failed"], "progress": progress, "message": f"Progress: {processed}/{len(symbol_ids)} ({progress:.1f}%)"}))
+                    enqueue_notification(notify_model_training_status(tenant_id, task_id, "progress", {"processed": processed, "total": len(symbol_ids), "successful": model_training_status[task_id]["successful"], "failed": model_training_status[task_id]["failed"], "progress": progress, "message": f"Progress: {processed}/{len(symbol_ids)} ({progress:.1f}%)"}))
 
                 return symbol_id, result
             except Exception as e:
@@ -543,7 +535,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
         model_training_status[task_id].update({"status": "completed", "completed_at": datetime.now().isoformat(), "success_count": success_count, "total_count": len(symbol_ids)})
 
         # Send completion notification
-        asyncio.create_task(notify_model_training_status(tenant_id, task_id, "completed", {"message": f"Training completed: {success_count}/{len(symbol_ids)} successful", "success_count": success_count, "total_count": len(symbol_ids)}))
+        enqueue_notification(notify_model_training_status(tenant_id, task_id, "completed", {"message": f"Training completed: {success_count}/{len(symbol_ids)} successful", "success_count": success_count, "total_count": len(symbol_ids)}))
 
         return results
 
@@ -554,7 +546,7 @@ def train_models_for_tenant(tenant_id: int, request: Optional[ModelRequest] = No
         model_training_status[task_id].update({"status": "failed", "error": str(e), "completed_at": datetime.now().isoformat()})
 
         # Send error notification
-        asyncio.create_task(notify_model_training_status(tenant_id, task_id, "failed", {"error": str(e)}))
+        enqueue_notification(notify_model_training_status(tenant_id, task_id, "failed", {"error": str(e)}))
 
         return results
     finally:
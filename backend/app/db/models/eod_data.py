@@ -1,5 +1,5 @@
 # backend/app/db/models/eod_data.py
-from sqlalchemy import Column, String, Integer, Float, Date, Boolean, BigInteger, UniqueConstraint, DateTime, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, Float, Date, Boolean, BigInteger, UniqueConstraint, DateTime, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -7,10 +7,8 @@ from app.db.base import Base
 
 class EODData(Base):
     __tablename__ = "eod_data"
-    __table_args__ = (
-        UniqueConstraint("symbol_id", "date", name="unique_symbol_eod_date"),
-        Index("idx_eod_symbol_date", "symbol_id", "date"),
-    )
+    # The unique constraint's (symbol_id, date) index serves every symbol/date lookup and anti-join
+    __table_args__ = (UniqueConstraint("symbol_id", "date", name="unique_symbol_eod_date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     symbol_id = Column(Integer, ForeignKey("symbols.id"), nullable=False)
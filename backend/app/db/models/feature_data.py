@@ -1,15 +1,13 @@
 # backend/app/db/models/feature_data.py
-from sqlalchemy import Column, Integer, Float, Date, String, ForeignKey, UniqueConstraint, Index, DateTime
+from sqlalchemy import Column, Integer, Float, Date, String, ForeignKey, UniqueConstraint, DateTime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class FeatureData(Base):
     __tablename__ = "feature_data"
-    __table_args__ = (
-        UniqueConstraint("symbol_id", "date", name="unique_symbol_feature_date"),
-        Index("idx_feature_symbol_date", "symbol_id", "date"),
-    )
+    # The unique constraint's (symbol_id, date) index serves every symbol/date lookup and anti-join
+    __table_args__ = (UniqueConstraint("symbol_id", "date", name="unique_symbol_feature_date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     symbol_id = Column(Integer, ForeignKey("symbols.id"), nullable=False)
@@ -1,5 +1,5 @@
 # backend/app/db/models/prediction.py
-from sqlalchemy import Column, String, Integer, Float, Date, Boolean, UniqueConstraint, DateTime, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, Float, Date, Boolean, UniqueConstraint, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -15,6 +15,10 @@ class Prediction(Base):
     __table_args__ = (
         UniqueConstraint("tenant_id", "symbol_id", "date", name="unique_tenant_symbol_prediction_date"),
         Index("idx_prediction_tenant_symbol_date", "tenant_id", "symbol_id", "date"),
+        # Paginated listing: WHERE tenant_id = ? ORDER BY date DESC LIMIT n, filter columns served from the index
+        Index("idx_prediction_tenant_date_desc", "tenant_id", text("date DESC"), "symbol_id", postgresql_include=["strong_move_confidence", "direction_prediction", "verified"]),
+        # Verification only ever scans a tenant's unverified predictions
+        Index("idx_prediction_unverified", "tenant_id", "date", postgresql_where=text("verified = false")),
     )
 
     id = Column(Integer, primary_key=True, index=True)
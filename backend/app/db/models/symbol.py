@@ -1,5 +1,5 @@
 # backend/app/db/models/symbol.py
-from sqlalchemy import Column, String, Integer, Boolean, UniqueConstraint, DateTime, Index
+from sqlalchemy import Column, String, Integer, Boolean, UniqueConstraint, DateTime, Index, DDL, event, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -10,12 +10,18 @@ class Symbol(Base):
     __table_args__ = (
         UniqueConstraint("trading_symbol", "exchange", name="unique_symbol_exchange"),
         Index("idx_symbol_active", "active"),
+        Index("idx_symbol_trading_symbol_id", "trading_symbol", "id"),
+        # Listings default to active symbols only
+        Index("idx_symbol_active_trading_symbol", "trading_symbol", "id", postgresql_where=text("active")),
+        # Trigram indexes so search_symbols' ILIKE '%term%' does not scan the whole table
+        Index("idx_symbol_trading_symbol_trgm", "trading_symbol", postgresql_using="gin", postgresql_ops={"trading_symbol": "gin_trgm_ops"}),
+        Index("idx_symbol_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     security_id = Column(String, nullable=False)
     exchange = Column(String, nullable=False)
-    trading_symbol = Column(String, nullable=False, index=True)
+    trading_symbol = Column(String, nullable=False)
     name = Column(String, nullable=False)
     instrument_type = Column(String, nullable=False)
     segment = Column(String)
@@ -30,3 +36,7 @@ class Symbol(Base):
     eod_data = relationship("EODData", back_populates="symbol")
     models = relationship("PredictionModel", back_populates="symbol")
     predictions = relationship("Prediction", back_populates="symbol")  # No back_populates
+
+
+# gin_trgm_ops comes from pg_trgm, which has to exist before create_all builds the trigram indexes
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
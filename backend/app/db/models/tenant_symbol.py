@@ -1,5 +1,5 @@
 # app/db/models/tenant_symbol.py
-from sqlalchemy import Column, Integer, Boolean, ForeignKey, UniqueConstraint, Index, DateTime, String
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, UniqueConstraint, Index, DateTime, String, text
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -9,6 +9,10 @@ class TenantSymbol(Base):
     __table_args__ = (
         UniqueConstraint("tenant_id", "symbol_id", name="unique_tenant_symbol"),
         Index("idx_tenant_symbol", "tenant_id", "symbol_id"),
+        # Active watchlist in priority order without touching the heap (get_tenant_watchlist)
+        Index("idx_tenant_symbol_active_priority", "tenant_id", text("priority DESC"), postgresql_include=["id", "symbol_id", "notes", "created_at"], postgresql_where=text("is_active")),
+        # Membership checks and active counts only ever look at active entries
+        Index("idx_tenant_symbol_active", "tenant_id", "symbol_id", postgresql_where=text("is_active")),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -1,5 +1,5 @@
 # backend/app/db/models/user.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -7,6 +7,7 @@ from app.db.base import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("idx_user_tenant_id", "tenant_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, nullable=False, index=True)
@@ -1,5 +1,6 @@
 # backend/app/db/session.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
@@ -7,7 +8,10 @@ from app.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, pool_recycle=3600, pool_size=10, max_overflow=20)
+# With psycopg 3, hot single-row lookups are auto-prepared server-side after DB_PREPARE_THRESHOLD executions
+connect_args = {"prepare_threshold": settings.DB_PREPARE_THRESHOLD} if make_url(SQLALCHEMY_DATABASE_URL).get_driver_name() == "psycopg" else {}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, pool_recycle=3600, pool_size=10, max_overflow=20, query_cache_size=1200, echo=settings.DATABASE_ECHO, connect_args=connect_args)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -22,3 +26,14 @@ def get_db_session() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def relax_commit_durability(db: Session) -> None:
+    """
+    Skip the WAL fsync for the current transaction (SET LOCAL synchronous_commit = off).
+
+    Only use this for bulk loads of tables that can be rebuilt from source (EOD data,
+    derived features): a crash may lose the last few commits, but never corrupts data.
+    The setting reverts automatically when the transaction ends.
+    """
+    db.execute(text("SET LOCAL synchronous_commit = off"))
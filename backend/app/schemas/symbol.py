@@ -31,6 +31,7 @@ class SymbolResponse(SymbolBase):
 class SymbolList(BaseModel):
     symbols: List[SymbolResponse]
     count: int
+    next_cursor: Optional[str] = None
 
 
 # Models for statistics
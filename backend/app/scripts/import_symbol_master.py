@@ -135,7 +135,8 @@ def process_symbols(db: Session, df: pd.DataFrame) -> Tuple[int, int, int, List[
     changes = []
 
     # Process symbols
-    for _, row in df.iterrows():
+    # Iterate plain dicts; iterrows() boxes every row into a Series
+    for row in df.to_dict("records"):
         trading_symbol = row["SEM_TRADING_SYMBOL"]
         security_id = str(row.get("SEM_SMST_SECURITY_ID", "")).strip()
         exchange = row.get("SEM_EXM_EXCH_ID", "")
@@ -1,26 +1,60 @@
 # backend/app/services/config_service.py
-from typing import Any, Dict, Optional
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.db.models.config_param import ConfigParam, DEFAULT_CONFIG
 from app.db.models.tenant import Tenant
 
+# Process-wide cache of resolved config values keyed by (tenant_id, key)
+CONFIG_CACHE_TTL = 60  # seconds
+CONFIG_CACHE_MAX_SIZE = 1024
+_config_cache: Dict[Tuple[int, str], Tuple[float, Any]] = {}
+_config_cache_lock = threading.Lock()
+
+
+def invalidate_tenant_config_cache(tenant_id: Optional[int] = None) -> None:
+    """Drop cached config values for one tenant, or for all tenants"""
+    with _config_cache_lock:
+        if tenant_id is None:
+            _config_cache.clear()
+            return
+
+        for cache_key in [k for k in _config_cache if k[0] == tenant_id]:
+            del _config_cache[cache_key]
+
 
 def get_tenant_config(db: Session, tenant_id: int, key: str) -> Any:
     """
     Get a tenant-specific configuration value.
-    Falls back to default if not found.
+    Falls back to default if not found. Values are cached for CONFIG_CACHE_TTL seconds.
     """
+    cache_key = (tenant_id, key)
+    now = time.monotonic()
+
+    with _config_cache_lock:
+        cached = _config_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+
     param = db.query(ConfigParam).filter(ConfigParam.tenant_id == tenant_id, ConfigParam.key == key).first()
 
     if param:
-        return param.value
+        value = param.value
+    elif key in DEFAULT_CONFIG:
+        # Return default if exists
+        value = DEFAULT_CONFIG[key]["value"]
+    else:
+        value = None
 
-    # Return default if exists
-    if key in DEFAULT_CONFIG:
-        default_config = DEFAULT_CONFIG[key]
-        return default_config["value"]
+    with _config_cache_lock:
+        if len(_config_cache) >= CONFIG_CACHE_MAX_SIZE:
+            # Evict the oldest entry
+            del _config_cache[next(iter(_config_cache))]
+        _config_cache[cache_key] = (now + CONFIG_CACHE_TTL, value)
 
-    return None
+    return value
 
 
 def get_tenant_full_config(db: Session, tenant_id: int) -> Dict[str, Any]:
@@ -78,29 +112,21 @@ def set_tenant_config(db: Session, tenant_id: int, key: str, value: Any) -> Conf
     db.add(param)
     db.commit()
     db.refresh(param)
+    invalidate_tenant_config_cache(tenant_id)
     return param
 
 
 def initialize_tenant_config(db: Session, tenant_id: int) -> None:
     """
     Initialize default config for a new tenant.
+    All defaults are written in a single INSERT; keys the tenant already has are left untouched.
     """
+    rows = []
     for key, config in DEFAULT_CONFIG.items():
-        param = ConfigParam(tenant_id=tenant_id, key=key, description=config["description"])
-
-        # Set value based on type
-        value = config["value"]
-        value_type = config["type"]
-
-        if value_type == "bool":
-            param.value_bool = value
-        elif value_type == "int":
-            param.value_int = value
-        elif value_type == "float":
-            param.value_float = value
-        else:  # str
-            param.value_str = value
-
-        db.add(param)
+        # Set value based on type (value_bool / value_int / value_float / value_str)
+        value_type = config["type"] if config["type"] in ("bool", "int", "float") else "str"
+        rows.append({"tenant_id": tenant_id, "key": key, "description": config["description"], "value_bool": None, "value_int": None, "value_float": None, "value_str": None, f"value_{value_type}": config["value"]})
 
+    db.execute(pg_insert(ConfigParam).values(rows).on_conflict_do_nothing(constraint="unique_tenant_param"))
     db.commit()
+    invalidate_tenant_config_cache(tenant_id)
@@ -4,17 +4,22 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import date, datetime, timedelta, timezone
 import pandas as pd
+import numpy as np
 import time
 import os
 import requests
 import random
 import threading
-from sqlalchemy import func
+from bisect import bisect_left, bisect_right
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.db.models.eod_data import EODData
 from app.db.models.symbol import Symbol
 from app.db.models.config_param import ConfigParam
+from app.db.session import get_db_session, relax_commit_durability
 from app.websockets.connection_manager import connection_manager
+from app.utils.json_utils import encode_message
 from app.core.logger import get_logger
 from app.config import settings
 from app.services.config_service import get_tenant_config
@@ -22,6 +27,7 @@ from app.services.config_service import get_tenant_config
 logger = get_logger(__name__)
 
 INDIA_TZ = timezone(timedelta(hours=5, minutes=30))
+INDIA_TZ_OFFSET_SECONDS = int(INDIA_TZ.utcoffset(None).total_seconds())
 
 # Cache directory
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
@@ -42,6 +48,12 @@ MAX_RETRIES = 3
 RETRY_BACKOFF_FACTOR = 2
 RETRY_INITIAL_WAIT = 0.5  # seconds
 
+# Number of symbols processed between commits in the import task
+IMPORT_COMMIT_BATCH_SIZE = 50
+
+# Rows per multi-row INSERT statement in bulk upserts
+UPSERT_PAGE_SIZE = 1000
+
 # Default date range
 DEFAULT_FROM_DATE = date(2000, 1, 1)
 
@@ -59,7 +71,8 @@ def update_eod_status(task_id: str, updates: Dict[str, Any]):
 
 async def notify_eod_import_status(task_id: str, status: str, details: Dict[str, Any] = None):
     """Send WebSocket notification about EOD import status"""
-    message = {"type": "eod_import_status", "timestamp": datetime.now().isoformat(), "data": {"task_id": task_id, "status": status, **(details or {})}}
+    # Encode once for both topics
+    message = encode_message({"type": "eod_import_status", "timestamp": datetime.now().isoformat(), "data": {"task_id": task_id, "status": status, **(details or {})}})
 
     # Broadcast to system topic (for superadmins)
     await connection_manager.broadcast(message, "system")
@@ -70,14 +83,12 @@ async def notify_eod_import_status(task_id: str, status: str, details: Dict[str,
 
 def get_latest_eod_date(db: Session, symbol_id: int) -> Optional[date]:
     """Get the latest EOD date for a specific symbol"""
-    result = db.query(EODData.date).filter(EODData.symbol_id == symbol_id).order_by(EODData.date.desc()).first()
-    return result[0] if result else None
+    return db.scalar(select(func.max(EODData.date)).where(EODData.symbol_id == symbol_id))
 
 
-def is_market_holiday(check_date: date) -> bool:
-    """Check if a date is a market holiday"""
-    # 2025 Market holidays
-    holidays_2025 = [
+# Market holidays
+MARKET_HOLIDAYS = frozenset(
+    [
         date(2025, 1, 1),  # New Year's Day
         date(2025, 1, 26),  # Republic Day
         date(2025, 3, 2),  # Mahashivratri
@@ -93,8 +104,16 @@ def is_market_holiday(check_date: date) -> bool:
         date(2025, 11, 14),  # Diwali (Balipratipada)
         date(2025, 12, 25),  # Christmas
     ]
+)
 
-    return check_date in holidays_2025
+# Range covered by the precomputed trading calendar
+CALENDAR_START = date(1990, 1, 1)
+CALENDAR_END = date(2050, 12, 31)
+
+
+def is_market_holiday(check_date: date) -> bool:
+    """Check if a date is a market holiday"""
+    return check_date in MARKET_HOLIDAYS
 
 
 def is_weekend(check_date: date) -> bool:
@@ -102,14 +121,40 @@ def is_weekend(check_date: date) -> bool:
     return check_date.weekday() >= 5  # 5=Saturday, 6=Sunday
 
 
+def _build_trading_calendar(start: date, end: date) -> List[date]:
+    """Build the sorted list of trading days between two dates (inclusive)"""
+    days = []
+    current_date = start
+    while current_date <= end:
+        if not (is_weekend(current_date) or is_market_holiday(current_date)):
+            days.append(current_date)
+        current_date += timedelta(days=1)
+    return days
+
+
+# Trading calendar computed once at import; lookups become set membership / bisection
+TRADING_CALENDAR = _build_trading_calendar(CALENDAR_START, CALENDAR_END)
+TRADING_DAY_SET = frozenset(TRADING_CALENDAR)
+
+
 def is_trading_day(check_date: date) -> bool:
     """Check if a date is a valid trading day"""
+    if CALENDAR_START <= check_date <= CALENDAR_END:
+        return check_date in TRADING_DAY_SET
     return not (is_weekend(check_date) or is_market_holiday(check_date))
 
 
-def is_market_closed() -> bool:
+def get_trading_days(from_date: date, to_date: date) -> List[date]:
+    """Get all trading days between two dates (inclusive), in ascending order"""
+    if CALENDAR_START <= from_date and to_date <= CALENDAR_END:
+        return TRADING_CALENDAR[bisect_left(TRADING_CALENDAR, from_date) : bisect_right(TRADING_CALENDAR, to_date)]
+    return _build_trading_calendar(from_date, to_date)
+
+
+def is_market_closed(now: Optional[datetime] = None) -> bool:
     """Check if market is closed based on time of day"""
-    now = datetime.now(tz=INDIA_TZ)
+    if now is None:
+        now = datetime.now(tz=INDIA_TZ)
     # Market closes at 3:30 PM IST
     return now.hour > 15 or (now.hour == 15 and now.minute >= 30)
 
@@ -225,8 +270,12 @@ def create_eod_objects(symbol_dict: Dict, data: Dict, existing_dates: set, symbo
         # Track new seen dates to avoid duplicates within this batch
         seen_dates = set()
 
+        # Convert all timestamps to IST trading dates in one vectorized pass
+        ts_array = np.asarray(ts_list, dtype="int64")
+        dates = (ts_array + INDIA_TZ_OFFSET_SECONDS).astype("datetime64[s]").astype("datetime64[D]").tolist()
+
         # Sort by timestamp ascending for correct prev_close calculation
-        sorted_indices = sorted(range(len(ts_list)), key=lambda i: ts_list[i])
+        sorted_indices = np.argsort(ts_array, kind="stable").tolist()
 
         # Initialize prev_close lookup dict for this symbol if needed
         symbol_id = symbol_dict["id"]
@@ -237,9 +286,7 @@ def create_eod_objects(symbol_dict: Dict, data: Dict, existing_dates: set, symbo
         prev_close = None
 
         for idx in sorted_indices:
-            ts = ts_list[idx]
-            # Convert timestamp to date
-            dt = datetime.fromtimestamp(ts).date()
+            dt = dates[idx]
 
             # Skip duplicates (both existing in DB and within this batch)
             if dt in existing_dates or dt in seen_dates:
@@ -312,74 +359,75 @@ def get_prev_close_map(db: Session) -> Dict[int, Dict[date, float]]:
 
 
 def bulk_insert_eod_data(db: Session, candles: List[EODData]) -> int:
-    """Bulk insert EOD data with error handling"""
-    try:
-        if not candles:
-            return 0
+    """
+    Bulk insert EOD data with error handling
 
-        # Ensure no NULL change_percent values
-        for candle in candles:
-            if candle.change_percent is None:
-                candle.change_percent = 0.0
+    Rows are flushed inside savepoints and left for the caller to commit, so the
+    import task can commit many symbols at once.
+    """
+    if not candles:
+        return 0
+
+    # Ensure no NULL change_percent values
+    for candle in candles:
+        if candle.change_percent is None:
+            candle.change_percent = 0.0
 
-        db.bulk_save_objects(candles)
-        db.commit()
+    try:
+        with db.begin_nested():
+            db.bulk_save_objects(candles)
         return len(candles)
     except Exception as e:
-        db.rollback()
         logger.error(f"Bulk insert failed: {str(e)}")
 
-        # Try individual inserts if bulk fails
-        inserted = 0
-        for candle in candles:
-            try:
-                # Make sure change_percent is not NULL
-                if candle.change_percent is None:
-                    candle.change_percent = 0.0
-
+    # Try individual inserts if bulk fails
+    inserted = 0
+    for candle in candles:
+        try:
+            with db.begin_nested():
                 db.add(candle)
-                db.commit()
-                inserted += 1
-            except Exception as inner_e:
-                db.rollback()
-                logger.error(f"Individual insert failed for {candle.date}: {str(inner_e)}")
+            inserted += 1
+        except Exception as inner_e:
+            logger.error(f"Individual insert failed for {candle.date}: {str(inner_e)}")
 
-        return inserted
+    return inserted
 
 
 def import_eod_data(db: Session, symbol_id: int, data: List[Dict[str, Any]]) -> Tuple[int, int]:
     """
     Import EOD data for a specific symbol
 
+    Rows are upserted with INSERT ... ON CONFLICT (symbol_id, date) DO UPDATE
+    in pages of UPSERT_PAGE_SIZE, so no per-row existence check is needed.
+
     Returns:
         Tuple of (inserted_count, updated_count)
     """
+    if not data:
+        return 0, 0
+
+    # Ensure change_percent is never NULL; keep the last row per date, since one upsert
+    # statement cannot touch the same (symbol_id, date) row twice
+    rows = list({item["date"]: {"symbol_id": symbol_id, "date": item["date"], "open": item["open"], "high": item["high"], "low": item["low"], "close": item["close"], "volume": item["volume"], "change_percent": item.get("change_percent") or 0.0} for item in data}.values())
+
     inserted, updated = 0, 0
 
-    for item in data:
-        # Check if record already exists
-        existing = db.query(EODData).filter(EODData.symbol_id == symbol_id, EODData.date == item["date"]).first()
-
-        # Calculate change percent - this will already be in the item
-        change_percent = item.get("change_percent")
-        # Ensure change_percent is never NULL
-        if change_percent is None:
-            change_percent = 0.0
-
-        if existing:
-            # Update existing record
-            existing.open = item["open"]
-            existing.high = item["high"]
-            existing.low = item["low"]
-            existing.close = item["close"]
-            existing.volume = item["volume"]
-            existing.change_percent = change_percent
-            updated += 1
-        else:
-            # Create new record
-            new_record = EODData(symbol_id=symbol_id, date=item["date"], open=item["open"], high=item["high"], low=item["low"], close=item["close"], volume=item["volume"], change_percent=change_percent)
-            db.add(new_record)
-            inserted += 1
+    # EOD rows can always be re-imported, so trade commit durability for throughput
+    relax_commit_durability(db)
+
+    for start in range(0, len(rows), UPSERT_PAGE_SIZE):
+        stmt = pg_insert(EODData).values(rows[start : start + UPSERT_PAGE_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_symbol_eod_date",
+            set_={"open": stmt.excluded.open, "high": stmt.excluded.high, "low": stmt.excluded.low, "close": stmt.excluded.close, "volume": stmt.excluded.volume, "change_percent": stmt.excluded.change_percent, "updated_at": func.now()},
+        )
+        # xmax is 0 only for freshly inserted tuples, which lets us split inserts from updates
+        result = db.execute(stmt.returning(literal_column("(xmax = 0)")))
+        for (was_inserted,) in result:
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
 
     db.commit()
     return inserted, updated
@@ -387,6 +435,13 @@ def import_eod_data(db: Session, symbol_id: int, data: List[Dict[str, Any]]) ->
 
 def import_eod_data_from_dataframe(db: Session, symbol_id: int, df: pd.DataFrame) -> Tuple[int, int]:
     """Import EOD data from a pandas DataFrame"""
+    # Compute change percent for the whole frame at once when previous closes are supplied
+    if "prev_close" in df.columns:
+        close = df["close"].to_numpy(dtype=np.float64)
+        prev_close = df["prev_close"].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = df.assign(change_percent=np.where(prev_close > 0, (close - prev_close) / prev_close * 100.0, 0.0))
+
     # Convert DataFrame to list of dicts
     records = df.to_dict("records")
 
@@ -411,7 +466,7 @@ def get_eod_data(db: Session, symbol_id: int, start_date: Optional[date] = None,
     return query.limit(limit).all()
 
 
-def fetch_today_eod_data(db: Session, tenant_id: int, symbol_dict: Dict, today: date, prev_close_map: Dict[int, Dict[date, float]]) -> Optional[EODData]:
+def fetch_today_eod_data(db: Session, tenant_id: int, symbol_dict: Dict, today: date, prev_close_map: Dict[int, Dict[date, float]], market_closed: Optional[bool] = None) -> Optional[EODData]:
     """Fetch today's EOD data from DHAN API"""
     # Get API credentials from config
     credentials = get_api_credentials(db, tenant_id)
@@ -419,8 +474,11 @@ def fetch_today_eod_data(db: Session, tenant_id: int, symbol_dict: Dict, today:
         logger.error(f"Missing API credentials for tenant {tenant_id}")
         return None
 
-    # Only proceed if market is closed
-    if not is_market_closed():
+    # Only proceed if market is closed (callers in a loop pass the precomputed flag)
+    if market_closed is None:
+        market_closed = is_market_closed()
+
+    if not market_closed:
         logger.info(f"Market still open, skipping today's data fetch for {symbol_dict['trading_symbol']}")
         return None
 
@@ -510,9 +568,15 @@ def fetch_today_eod_data(db: Session, tenant_id: int, symbol_dict: Dict, today:
     return None
 
 
-async def fetch_and_insert_one_symbol(db: Session, tenant_id: int, symbol_dict: Dict, today: date, prev_close_map: Dict[int, Dict[date, float]], task_id: str) -> str:
-    """Fetch and insert EOD data for one symbol with optimized database operations"""
+async def fetch_and_insert_one_symbol(db: Session, tenant_id: int, symbol_dict: Dict, today: date, prev_close_map: Dict[int, Dict[date, float]], task_id: str, market_closed: Optional[bool] = None) -> str:
+    """
+    Fetch and insert EOD data for one symbol with optimized database operations
+
+    Writes go into a savepoint that is rolled back if the symbol fails; committing
+    is left to the caller, which batches several symbols per transaction.
+    """
     start_time = time.time()
+    savepoint = db.begin_nested()
 
     try:
         symbol = symbol_dict["trading_symbol"]
@@ -588,7 +652,7 @@ async def fetch_and_insert_one_symbol(db: Session, tenant_id: int, symbol_dict:
             logger.info(f"Fetching today's data for {symbol}")
 
             # Fetch today's EOD data using market quote API
-            today_data = fetch_today_eod_data(db, tenant_id, symbol_dict, today, prev_close_map)
+            today_data = fetch_today_eod_data(db, tenant_id, symbol_dict, today, prev_close_map, market_closed)
 
             if today_data:
                 # Make sure change_percent is not NULL
@@ -597,7 +661,7 @@ async def fetch_and_insert_one_symbol(db: Session, tenant_id: int, symbol_dict:
 
                 # Insert today's data
                 db.add(today_data)
-                db.commit()
+                db.flush()
                 logger.info(f"Inserted today's data for {symbol}")
 
                 # Store today's close for future calculations
@@ -609,17 +673,22 @@ async def fetch_and_insert_one_symbol(db: Session, tenant_id: int, symbol_dict:
         return f"[OK] {symbol} - processed in {elapsed:.2f}s"
 
     except Exception as e:
-        db.rollback()
+        savepoint.rollback()
         return f"[ERROR] {symbol_dict['trading_symbol']} failed: {str(e)}"
+    finally:
+        # Release the savepoint on every non-error path, including the early returns
+        if savepoint.is_active:
+            savepoint.commit()
 
 
 async def run_eod_import_task(task_id: str, tenant_id: int, force_download: bool = False):
     """Background task for EOD data import that updates status tracking and sends WebSocket notifications"""
-    from app.db.session import get_db_session
-
     try:
+        # Capture the task start time once; date and market state don't change per symbol
+        started_at = datetime.now(tz=INDIA_TZ)
+
         # Update status to started
-        update_eod_status(task_id, {"status": "started", "started_at": datetime.now(tz=INDIA_TZ).isoformat(), "progress": 0, "processed_symbols": 0})
+        update_eod_status(task_id, {"status": "started", "started_at": started_at.isoformat(), "progress": 0, "processed_symbols": 0})
 
         # Send initial notification
         await notify_eod_import_status(task_id, "started", {"started_at": eod_import_status[task_id]["started_at"], "message": "EOD data import started"})
@@ -635,8 +704,9 @@ async def run_eod_import_task(task_id: str, tenant_id: int, force_download: bool
         # Send start notification with total count
         await notify_eod_import_status(task_id, "started", {"message": f"EOD data import started for {total_symbols} symbols", "total_symbols": total_symbols})
 
-        # Get today's date
-        today = datetime.now(tz=INDIA_TZ).date()
+        # Get today's date and market state
+        today = started_at.date()
+        market_closed = is_market_closed(started_at)
 
         # Prepare symbol dicts
         symbol_dicts = [
@@ -654,33 +724,46 @@ async def run_eod_import_task(task_id: str, tenant_id: int, force_download: bool
         # Get previous close data
         prev_close_map = get_prev_close_map(session)
 
-        session.close()
-
-        # Process symbols sequentially (could be made parallel)
+        # Process symbols sequentially on the same session (could be made parallel)
         completed, failed = 0, 0
-        for i, sym_dict in enumerate(symbol_dicts):
-            # Get a new session for each symbol
-            session = next(get_db_session())
-
-            result = await fetch_and_insert_one_symbol(db=session, tenant_id=tenant_id, symbol_dict=sym_dict, today=today, prev_close_map=prev_close_map, task_id=task_id)
-
+        try:
+            for i, sym_dict in enumerate(symbol_dicts):
+                result = await fetch_and_insert_one_symbol(db=session, tenant_id=tenant_id, symbol_dict=sym_dict, today=today, prev_close_map=prev_close_map, task_id=task_id, market_closed=market_closed)
+
+                logger.info(result)
+
+                if result.startswith("[OK]"):
+                    completed += 1
+                elif result.startswith("[FAIL]") or result.startswith("[ERROR]"):
+                    failed += 1
+
+                # Each symbol only flushes into a savepoint, so commit in batches and drop
+                # loaded objects to keep the session small
+                if (i + 1) % IMPORT_COMMIT_BATCH_SIZE == 0:
+                    try:
+                        session.commit()
+                    except Exception as e:
+                        session.rollback()
+                        logger.error(f"Error committing EOD import batch: {str(e)}")
+                    session.expunge_all()
+
+                # Update progress
+                progress = (i + 1) / total_symbols * 100
+                update_eod_status(task_id, {"progress": progress, "processed_symbols": i + 1})
+
+                # Send progress update every 5% or 10 symbols
+                if (i + 1) % 10 == 0 or progress % 5 < 1:
+                    await notify_eod_import_status(task_id, "progress", {"progress": progress, "processed_symbols": i + 1, "successful_symbols": completed, "failed_symbols": failed, "message": f"Processed {i + 1} of {total_symbols} symbols ({progress:.1f}%)"})
+
+            # Final commit for the last partial batch
+            try:
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error committing EOD import batch: {str(e)}")
+        finally:
             session.close()
 
-            logger.info(result)
-
-            if result.startswith("[OK]"):
-                completed += 1
-            elif result.startswith("[FAIL]") or result.startswith("[ERROR]"):
-                failed += 1
-
-            # Update progress
-            progress = (i + 1) / total_symbols * 100
-            update_eod_status(task_id, {"progress": progress, "processed_symbols": i + 1})
-
-            # Send progress update every 5% or 10 symbols
-            if (i + 1) % 10 == 0 or progress % 5 < 1:
-                await notify_eod_import_status(task_id, "progress", {"progress": progress, "processed_symbols": i + 1, "successful_symbols": completed, "failed_symbols": failed, "message": f"Processed {i + 1} of {total_symbols} symbols ({progress:.1f}%)"})
-
         # Update status with result
         update_eod_status(task_id, {"status": "completed", "completed_at": datetime.now().isoformat(), "progress": 100, "result": {"successful": completed, "failed": failed, "total": total_symbols}})
 
@@ -724,25 +807,23 @@ def check_data_availability(db: Session, from_date: date = None, to_date: date =
     if not from_date:
         from_date = to_date - timedelta(days=30)
 
-    trading_days = []
-    current_date = from_date
-    while current_date <= to_date:
-        if is_trading_day(current_date):
-            trading_days.append(current_date)
-        current_date += timedelta(days=1)
+    trading_days = get_trading_days(from_date, to_date)
 
     # Get active symbols
     active_symbol_count = db.query(func.count(Symbol.id)).filter(Symbol.active == True).scalar()
 
+    # Get data point counts for the whole period in a single grouped query
+    counts_by_date = dict(db.query(EODData.date, func.count(EODData.id)).filter(EODData.date >= from_date, EODData.date <= to_date).group_by(EODData.date).all())
+
     # Get data points per day
     data_points = []
     for day in trading_days:
-        count = db.query(func.count(EODData.id)).filter(EODData.date == day).scalar()
+        count = counts_by_date.get(day, 0)
         coverage = count / active_symbol_count if active_symbol_count > 0 else 0
         data_points.append({"date": day.isoformat(), "count": count, "coverage": coverage})
 
     # Get overall statistics
-    total_data_points = db.query(func.count(EODData.id)).filter(EODData.date >= from_date, EODData.date <= to_date).scalar()
+    total_data_points = sum(counts_by_date.values())
 
     ideal_data_points = len(trading_days) * active_symbol_count
     overall_coverage = total_data_points / ideal_data_points if ideal_data_points > 0 else 0
@@ -755,13 +836,11 @@ def check_data_availability(db: Session, from_date: date = None, to_date: date =
 
     # Check for symbols missing today's data
     if is_trading_day(recent_trading_day) and is_market_closed():
-        symbols_with_recent_data = db.query(EODData.symbol_id).filter(EODData.date == recent_trading_day).distinct().all()
-
-        symbols_with_recent_data_ids = {s[0] for s in symbols_with_recent_data}
-
-        missing_symbols = db.query(Symbol).filter(Symbol.active == True, ~Symbol.id.in_(symbols_with_recent_data_ids)).all()
+        # Anti-join against the (symbol_id, date) index instead of shipping an IN list of ids
+        has_recent_data = db.query(EODData.id).filter(EODData.symbol_id == Symbol.id, EODData.date == recent_trading_day).exists()
 
-        for symbol in missing_symbols:
-            symbols_with_missing_data.append({"id": symbol.id, "trading_symbol": symbol.trading_symbol, "exchange": symbol.exchange})
+        # Select plain columns so rows come back dict-shaped without ORM hydration
+        missing_query = select(Symbol.id, Symbol.trading_symbol, Symbol.exchange).where(Symbol.active == True, ~has_recent_data)
+        symbols_with_missing_data = [dict(row) for row in db.execute(missing_query).mappings()]
 
     return {"from_date": from_date.isoformat(), "to_date": to_date.isoformat(), "trading_days": len(trading_days), "active_symbols": active_symbol_count, "total_data_points": total_data_points, "ideal_data_points": ideal_data_points, "overall_coverage": overall_coverage, "data_points_by_day": data_points, "symbols_with_missing_data": symbols_with_missing_data}
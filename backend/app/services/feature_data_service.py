@@ -1,56 +1,126 @@
 # app/services/feature_data_service.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy import Date, func, select, text
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 from datetime import date, datetime, timedelta
 import time
+import asyncio
+import json
+import threading
 from app.db.models.symbol import Symbol
 from app.db.models.feature_data import FeatureData
+from app.db.session import engine, get_db_session, relax_commit_durability
 from app.core.features.feature_engineer import calculate_features
 from app.core.logger import get_logger
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.core.redis_client import RedisError, get_redis_client
+from app.core.event_loop import enqueue_notification
+from app.utils.json_utils import dumps, encode_message
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
 from app.websockets.connection_manager import connection_manager
-import asyncio
 
 logger = get_logger(__name__)
 
-# In-memory tracking for feature calculation status
+# Feature calculation status lives in Redis when configured (shared across
+# workers), otherwise in this in-memory dict guarded by a lock
 feature_calculation_status = {}
+feature_status_lock = threading.Lock()
+FEATURE_STATUS_TTL = 60 * 60 * 24  # seconds
+
+# Minimum seconds between progress broadcasts; intermediate updates are coalesced
+PROGRESS_NOTIFY_INTERVAL = 1.0
+
+# Strong references to running calculation tasks so they are not garbage collected mid-run
+_background_tasks = set()
+
+# Columns written by save_features (everything except server-managed ones)
+FEATURE_COLUMNS = [column.name for column in FeatureData.__table__.columns if column.name not in ("id", "created_at", "updated_at")]
+
+# Rows per multi-row INSERT statement when saving features
+FEATURE_INSERT_PAGE_SIZE = 1000
+
+# Column types for EOD frames read for feature calculation (avoids object-dtype intermediates)
+EOD_FRAME_DTYPES = {"symbol_id": "int64", "open": "float64", "high": "float64", "low": "float64", "close": "float64", "volume": "int64", "change_percent": "float64"}
+EOD_READ_CHUNK_SIZE = 50000
+
+# Statements built once at import so SQLAlchemy's compiled cache is hit on every call
+MISSING_FEATURE_DATES_QUERY = text(
+    """
+    SELECT e.date
+    FROM eod_data e
+    LEFT JOIN feature_data f ON e.symbol_id = f.symbol_id AND e.date = f.date
+    WHERE e.symbol_id = :symbol_id
+    AND f.id IS NULL
+    ORDER BY e.date
+"""
+).columns(date=Date)
+
+MISSING_FEATURE_DATES_FOR_SYMBOLS_QUERY = text(
+    """
+    SELECT e.symbol_id, e.date
+    FROM eod_data e
+    LEFT JOIN feature_data f ON e.symbol_id = f.symbol_id AND e.date = f.date
+    WHERE e.symbol_id = ANY(:symbol_ids)
+    AND f.id IS NULL
+    ORDER BY e.symbol_id, e.date
+"""
+)
+
+EOD_FOR_SYMBOL_QUERY = text(
+    """
+    SELECT e.symbol_id, e.date, e.open, e.high, e.low, e.close, e.volume, e.change_percent
+    FROM eod_data e
+    WHERE e.symbol_id = :symbol_id
+    AND e.date >= :from_date
+    ORDER BY e.date
+"""
+)
+
+EOD_FOR_SYMBOLS_QUERY = text(
+    """
+    SELECT e.symbol_id, e.date, e.open, e.high, e.low, e.close, e.volume, e.change_percent
+    FROM eod_data e
+    WHERE e.symbol_id = ANY(:symbol_ids)
+    AND e.date >= :from_date
+    ORDER BY e.symbol_id, e.date
+"""
+)
+
 
+async def notify_feature_calculation_status(calculation_id: str, status: str, details: Dict[str, Any] = None, timestamp: Optional[str] = None):
+    """Send WebSocket notification about feature calculation status, reusing timestamp when the caller already formatted one"""
+    message = {"type": "feature_calculation_status", "timestamp": timestamp or datetime.now().isoformat(), "data": {"calculation_id": calculation_id, "status": status, **(details or {})}}
 
-async def notify_feature_calculation_status(calculation_id: str, status: str, details: Dict[str, Any] = None):
-    """Send WebSocket notification about feature calculation status"""
-    message = {"type": "feature_calculation_status", "timestamp": datetime.now().isoformat(), "data": {"calculation_id": calculation_id, "status": status, **(details or {})}}
+    payload = encode_message(message)
 
     # Broadcast to specific topic
-    await connection_manager.broadcast(message, f"feature_calculation_{calculation_id}")
+    await connection_manager.broadcast(payload, f"feature_calculation_{calculation_id}")
 
     # Also broadcast to features topic
-    await connection_manager.broadcast(message, "features")
+    await connection_manager.broadcast(payload, "features")
 
 
 def get_latest_feature_date(db: Session, symbol_id: int) -> Optional[date]:
     """Get the latest feature date for a symbol"""
-    result = db.query(func.max(FeatureData.date)).filter(FeatureData.symbol_id == symbol_id).first()
-    return result[0] if result and result[0] else None
+    return db.scalar(select(func.max(FeatureData.date)).where(FeatureData.symbol_id == symbol_id))
 
 
 def get_missing_feature_dates(db: Session, symbol_id: int) -> List[date]:
     """Get dates that have EOD data but no corresponding feature data"""
-    query = """
-        SELECT e.date
-        FROM eod_data e
-        LEFT JOIN feature_data f ON e.symbol_id = f.symbol_id AND e.date = f.date
-        WHERE e.symbol_id = :symbol_id
-        AND f.id IS NULL
-        ORDER BY e.date
-    """
+    return list(db.scalars(MISSING_FEATURE_DATES_QUERY, {"symbol_id": symbol_id}))
+
 
-    result = db.execute(text(query), {"symbol_id": symbol_id}).fetchall()
-    return [row[0] for row in result]
+def get_missing_feature_dates_for_symbols(db: Session, symbol_ids: List[int]) -> Dict[int, List[date]]:
+    """Get missing feature dates for many symbols with a single query"""
+    missing = {symbol_id: [] for symbol_id in symbol_ids}
+    for symbol_id, missing_date in db.execute(MISSING_FEATURE_DATES_FOR_SYMBOLS_QUERY, {"symbol_ids": list(symbol_ids)}):
+        missing[symbol_id].append(missing_date)
+
+    return missing
 
 
 def should_calculate_features(db: Session, symbol_id: int) -> bool:
@@ -60,10 +130,21 @@ def should_calculate_features(db: Session, symbol_id: int) -> bool:
     return len(missing_dates) > 0
 
 
-def get_eod_data_for_feature_calculation(db: Session, symbol_id: int, lookback_days: int = 60) -> pd.DataFrame:
+def read_eod_frame(db: Session, query: TextClause, params: Dict[str, Any]) -> pd.DataFrame:
+    """Read EOD rows into a typed DataFrame using a server-side cursor"""
+    chunks = list(pd.read_sql(query, db.bind.execution_options(stream_results=True), params=params, dtype=EOD_FRAME_DTYPES, chunksize=EOD_READ_CHUNK_SIZE))
+
+    if not chunks:
+        return pd.DataFrame(columns=list(EOD_FRAME_DTYPES) + ["date"])
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def get_eod_data_for_feature_calculation(db: Session, symbol_id: int, lookback_days: int = 60, missing_dates: Optional[List[date]] = None) -> pd.DataFrame:
     """Get EOD data for feature calculation with sufficient lookback"""
     # Get dates needing calculation
-    missing_dates = get_missing_feature_dates(db, symbol_id)
+    if missing_dates is None:
+        missing_dates = get_missing_feature_dates(db, symbol_id)
 
     if not missing_dates:
         return pd.DataFrame()  # No missing dates
@@ -72,95 +153,130 @@ def get_eod_data_for_feature_calculation(db: Session, symbol_id: int, lookback_d
     earliest_missing = min(missing_dates)
     from_date = earliest_missing - timedelta(days=lookback_days)
 
-    # Query to get EOD data for calculation
-    query = """
-        SELECT e.symbol_id, e.date, e.open, e.high, e.low, e.close, e.volume, e.change_percent
-        FROM eod_data e
-        WHERE e.symbol_id = :symbol_id 
-        AND e.date >= :from_date
-        ORDER BY e.date
-    """
+    return read_eod_frame(db, EOD_FOR_SYMBOL_QUERY, {"symbol_id": symbol_id, "from_date": from_date})
 
-    df = pd.read_sql(text(query), db.bind, params={"symbol_id": symbol_id, "from_date": from_date})
-    return df
 
+def get_eod_data_for_symbols(db: Session, missing_by_symbol: Dict[int, List[date]], lookback_days: int = 60) -> Dict[int, pd.DataFrame]:
+    """Get EOD data for feature calculation for many symbols with a single query"""
+    # Only symbols that actually have missing dates need data
+    from_dates = {symbol_id: min(dates) - timedelta(days=lookback_days) for symbol_id, dates in missing_by_symbol.items() if dates}
+
+    if not from_dates:
+        return {}
+
+    df = read_eod_frame(db, EOD_FOR_SYMBOLS_QUERY, {"symbol_ids": list(from_dates), "from_date": min(from_dates.values())})
+
+    # Split per symbol and trim each slice to its own lookback window
+    eod_by_symbol = {}
+    for symbol_id, symbol_df in df.groupby("symbol_id", sort=False):
+        eod_by_symbol[symbol_id] = symbol_df[symbol_df["date"] >= from_dates[symbol_id]].reset_index(drop=True)
+
+    return eod_by_symbol
 
-def save_features(db: Session, features_df: pd.DataFrame) -> Tuple[int, int]:
-    """Save calculated features to the database"""
-    if features_df.empty:
-        return 0, 0
 
-    inserted, skipped = 0, 0
+class ChunkedFeatureInsert:
+    """
+    Buffer feature rows and insert them in chunks of `chunksize`
+
+    Each flush is a single INSERT ... ON CONFLICT DO NOTHING round-trip. Rows still
+    buffered when the block exits normally are flushed; on error the buffer is dropped
+    and the caller is expected to roll back.
+    """
+
+    def __init__(self, db: Session, chunksize: int = FEATURE_INSERT_PAGE_SIZE):
+        self.db = db
+        self.chunksize = chunksize
+        self.buffer: List[Dict[str, Any]] = []
+        self.inserted = 0
+        self.attempted = 0
+
+    def __enter__(self) -> "ChunkedFeatureInsert":
+        return self
 
-    # Process each row
-    for _, row in features_df.iterrows():
-        symbol_id = row["symbol_id"]
-        feature_date = row["date"]
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.flush()
+        else:
+            self.buffer.clear()
+        return False
 
-        # Check if feature already exists
-        existing = db.query(FeatureData).filter(FeatureData.symbol_id == symbol_id, FeatureData.date == feature_date).first()
+    def add(self, row: Dict[str, Any]):
+        """Queue a row, flushing once the buffer reaches chunksize"""
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunksize:
+            self.flush()
 
-        if existing:
-            skipped += 1
-            continue
+    def flush(self):
+        """Insert all buffered rows in one statement"""
+        if not self.buffer:
+            return
 
-        # Create new feature entry
-        feature = FeatureData(symbol_id=symbol_id, date=feature_date, week_day=row.get("week_day"), volatility_squeeze=row.get("volatility_squeeze"), trend_zone_strength=row.get("trend_zone_strength"), range_compression_ratio=row.get("range_compression_ratio"), volume_spike_ratio=row.get("volume_spike_ratio"), body_to_range_ratio=row.get("body_to_range_ratio"), distance_from_ema_5=row.get("distance_from_ema_5"), gap_pct=row.get("gap_pct"), return_3d=row.get("return_3d"), atr_5=row.get("atr_5"), hl_range=row.get("hl_range"), rsi_14=row.get("rsi_14"), close_ema50_gap_pct=row.get("close_ema50_gap_pct"), open_gap_pct=row.get("open_gap_pct"), macd_histogram=row.get("macd_histogram"), atr_14_normalized=row.get("atr_14_normalized"))
+        stmt = pg_insert(FeatureData).values(self.buffer).on_conflict_do_nothing(constraint="unique_symbol_feature_date").returning(FeatureData.id)
+        self.inserted += len(self.db.execute(stmt).fetchall())
+        self.attempted += len(self.buffer)
+        self.buffer = []
 
-        db.add(feature)
-        inserted += 1
 
-        # Commit in batches to avoid large transactions
-        if inserted % 100 == 0:
-            try:
-                db.commit()
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error saving features batch: {e}")
+def save_features(db: Session, features_df: pd.DataFrame) -> Tuple[int, int]:
+    """Save calculated features to the database, skipping rows that already exist"""
+    if features_df.empty:
+        return 0, 0
 
-    # Final commit
     try:
+        # Features are derived from EOD data and can be recalculated, so skip the WAL fsync
+        relax_commit_durability(db)
+
+        # Missing feature columns become NULL; to_dict yields native Python scalars for the driver
+        with ChunkedFeatureInsert(db) as chunked_insert:
+            for row in features_df.reindex(columns=FEATURE_COLUMNS).to_dict("records"):
+                chunked_insert.add(row)
+
         db.commit()
     except Exception as e:
         db.rollback()
-        logger.error(f"Error in final commit: {e}")
-        return 0, skipped
+        logger.error(f"Error saving features: {e}")
+        return 0, 0
 
-    return inserted, skipped
+    return chunked_insert.inserted, chunked_insert.attempted - chunked_insert.inserted
 
 
-def calculate_features_for_symbol(db: Session, symbol_id: int) -> Dict[str, Any]:
-    """Calculate features for a single symbol"""
+def calculate_features_for_symbol(db: Session, symbol_id: int, missing_dates: Optional[List[date]] = None, eod_df: Optional[pd.DataFrame] = None, symbol: Optional[Symbol] = None) -> Dict[str, Any]:
+    """
+    Calculate features for a single symbol
+
+    Batch callers can pass missing_dates (from get_missing_feature_dates_for_symbols),
+    eod_df (from get_eod_data_for_symbols) and the preloaded symbol to skip the
+    per-symbol queries.
+    """
     start_time = time.time()
 
     try:
-        # Check if calculation is needed
-        if not should_calculate_features(db, symbol_id):
+        # Get symbol info
+        if symbol is None:
             symbol = db.query(Symbol).filter(Symbol.id == symbol_id).first()
+
+        # Check if calculation is needed
+        if missing_dates is None:
+            missing_dates = get_missing_feature_dates(db, symbol_id)
+
+        if not missing_dates:
             logger.info(f"Skipping {symbol.trading_symbol if symbol else symbol_id} — all features up-to-date")
             return {"status": "skipped", "message": "No missing feature dates"}
 
-        # Get symbol info
-        symbol = db.query(Symbol).filter(Symbol.id == symbol_id).first()
         if not symbol:
             return {"status": "error", "message": "Symbol not found"}
 
         # Get EOD data
-        eod_df = get_eod_data_for_feature_calculation(db, symbol_id)
+        if eod_df is None:
+            eod_df = get_eod_data_for_feature_calculation(db, symbol_id, missing_dates=missing_dates)
 
         if eod_df.empty:
             return {"status": "skipped", "message": "No EOD data available"}
 
         # Calculate features
         logger.info(f"Calculating features for {symbol.trading_symbol} with {len(eod_df)} records")
-        features_df = calculate_features(eod_df, symbol.trading_symbol)
-
-        if features_df.empty:
-            return {"status": "error", "message": "Feature calculation failed"}
-
-        # Get missing dates to filter results
-        missing_dates = get_missing_feature_dates(db, symbol_id)
-        features_df = features_df[features_df["date"].isin(missing_dates)]
+        # Only rows for the missing dates come back; the rest of the window is warmup
+        features_df = calculate_features(eod_df, symbol.trading_symbol, tail_dates=set(missing_dates))
 
         if features_df.empty:
             return {"status": "skipped", "message": "No new features to save"}
@@ -203,9 +319,18 @@ def calculate_features_batch(db: Session, symbol_ids: Optional[List[int]] = None
 
     results = {"total": len(symbol_ids), "successful": 0, "skipped": 0, "errors": 0, "details": {}}
 
+    # Look up missing dates for every symbol up front
+    missing_by_symbol = get_missing_feature_dates_for_symbols(db, symbol_ids)
+
+    # Load EOD data for all symbols that need calculation in one query
+    eod_by_symbol = get_eod_data_for_symbols(db, missing_by_symbol)
+
+    # Load all symbols in one query
+    symbol_map = {s.id: s for s in db.query(Symbol).filter(Symbol.id.in_(symbol_ids)).all()}
+
     # Process each symbol
     for i, symbol_id in enumerate(symbol_ids):
-        result = calculate_features_for_symbol(db, symbol_id)
+        result = calculate_features_for_symbol(db, symbol_id, missing_dates=missing_by_symbol.get(symbol_id, []), eod_df=eod_by_symbol.get(symbol_id, pd.DataFrame()), symbol=symbol_map.get(symbol_id))
         results["details"][symbol_id] = result
 
         if result["status"] == "success":
@@ -228,25 +353,108 @@ def calculate_features_batch(db: Session, symbol_ids: Optional[List[int]] = None
     return results
 
 
-def get_feature_calculation_status(calculation_id: str) -> Dict[str, Any]:
-    """Get the status of a feature calculation batch"""
-    if calculation_id not in feature_calculation_status:
-        return {"status": "not_found"}
+def _feature_status_key(calculation_id: str) -> str:
+    return f"featcalc:{calculation_id}"
+
 
-    return feature_calculation_status[calculation_id]
+def update_feature_calculation_status(calculation_id: str, updates: Dict[str, Any]):
+    """Set fields on a feature calculation's status"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            key = _feature_status_key(calculation_id)
+            client.hset(key, mapping={field: dumps(value) for field, value in updates.items()})
+            client.expire(key, FEATURE_STATUS_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis feature status update failed, using in-process state: {e}")
+
+    with feature_status_lock:
+        feature_calculation_status.setdefault(calculation_id, {"details": {}}).update(updates)
+
+
+def increment_feature_calculation_status(calculation_id: str, field: str, amount: int = 1):
+    """Atomically increment a counter on a feature calculation's status"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.hincrby(_feature_status_key(calculation_id), field, amount)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis feature status update failed, using in-process state: {e}")
+
+    with feature_status_lock:
+        status = feature_calculation_status.setdefault(calculation_id, {"details": {}})
+        status[field] = status.get(field, 0) + amount
+
+
+def set_feature_calculation_detail(calculation_id: str, symbol_id: int, result: Dict[str, Any]):
+    """Record the per-symbol result of a feature calculation"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            key = f"{_feature_status_key(calculation_id)}:details"
+            client.hset(key, str(symbol_id), dumps(result))
+            client.expire(key, FEATURE_STATUS_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis feature status update failed, using in-process state: {e}")
+
+    with feature_status_lock:
+        feature_calculation_status.setdefault(calculation_id, {"details": {}})["details"][symbol_id] = result
+
+
+def get_feature_calculation_status(calculation_id: str) -> Dict[str, Any]:
+    """Get the status of a feature calculation batch (from Redis when reachable, else this process)"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            key = _feature_status_key(calculation_id)
+            fields = client.hgetall(key)
+            if fields:
+                status = {field: json.loads(value) for field, value in fields.items()}
+                status["details"] = {int(symbol_id): json.loads(result) for symbol_id, result in client.hgetall(f"{key}:details").items()}
+                return status
+        except RedisError as e:
+            logger.warning(f"Redis feature status read failed, using in-process state: {e}")
+
+    with feature_status_lock:
+        if calculation_id not in feature_calculation_status:
+            return {"status": "not_found"}
+
+        # Return a copy to avoid race conditions
+        status = dict(feature_calculation_status[calculation_id])
+        status["details"] = dict(status.get("details", {}))
+        return status
+
+
+def _init_feature_worker():
+    """Process pool initializer: drop pooled DB connections inherited from the parent"""
+    engine.dispose(close=False)
+
+
+def _calculate_features_worker(symbol_id: int, missing_dates: Optional[List[date]] = None) -> Tuple[int, Dict[str, Any]]:
+    """Process pool worker: calculate features for one symbol on its own session"""
+    local_db = next(get_db_session())
+    try:
+        return symbol_id, calculate_features_for_symbol(local_db, symbol_id, missing_dates=missing_dates)
+    finally:
+        local_db.close()
 
 
 def run_feature_calculation_background(calculation_id: str, symbol_ids: Optional[List[int]] = None, active_only: bool = True, fo_eligible: bool = False):
     """Run feature calculation as a background task with a provided calculation ID"""
-    from app.db.session import get_db_session
-
     db = next(get_db_session())
-    feature_calculation_status[calculation_id] = {"status": "running", "started_at": datetime.now().isoformat(), "total": 0, "processed": 0, "successful": 0, "errors": 0, "details": {}}
-
-    # Send initial notification
-    asyncio.create_task(notify_feature_calculation_status(calculation_id, "started", {"started_at": feature_calculation_status[calculation_id]["started_at"]}))
+    # Format wall-clock times only at phase transitions; progress uses monotonic deltas
+    started_at = datetime.now().isoformat()
+    started_monotonic = time.monotonic()
 
     try:
+        update_feature_calculation_status(calculation_id, {"status": "running", "started_at": started_at, "total": 0, "processed": 0, "successful": 0, "errors": 0})
+
+        # Send initial notification
+        enqueue_notification(notify_feature_calculation_status(calculation_id, "started", {"started_at": started_at}, timestamp=started_at))
+
         # Fetch symbol IDs to process
         if not symbol_ids:
             query = db.query(Symbol.id)
@@ -257,50 +465,62 @@ def run_feature_calculation_background(calculation_id: str, symbol_ids: Optional
 
             symbol_ids = [s.id for s in query.all()]
 
-        feature_calculation_status[calculation_id]["total"] = len(symbol_ids)
+        update_feature_calculation_status(calculation_id, {"total": len(symbol_ids)})
+
+        # Look up missing dates for the whole run once; workers reuse their slice
+        missing_by_symbol = get_missing_feature_dates_for_symbols(db, symbol_ids)
 
-        # Define the worker
-        def worker(symbol_id):
-            local_db = next(get_db_session())
-            try:
-                result = calculate_features_for_symbol(local_db, symbol_id)
-                return symbol_id, result
-            finally:
-                local_db.close()
+        # Feature engineering is CPU-bound, so use one process per core
+        num_workers = min(32, multiprocessing.cpu_count())
 
-        num_workers = min(32, multiprocessing.cpu_count() * 2)
+        # Track counts locally for notifications
+        processed, successful, errors = 0, 0, 0
+        last_notified = 0.0
+
+        # Symbols with nothing missing are settled here instead of round-tripping through a worker
+        pending_ids = [sid for sid in symbol_ids if missing_by_symbol.get(sid)]
+        for sid in symbol_ids:
+            if not missing_by_symbol.get(sid):
+                set_feature_calculation_detail(calculation_id, sid, {"status": "skipped", "message": "No missing feature dates"})
+                processed += 1
+        if processed:
+            update_feature_calculation_status(calculation_id, {"processed": processed})
 
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = {executor.submit(worker, sid): sid for sid in symbol_ids}
+        # Spawn fresh interpreters: forking the running server would copy its event loop, threads and locks
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_feature_worker, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(_calculate_features_worker, sid, missing_by_symbol[sid]): sid for sid in pending_ids}
 
-            # Track processed count for progress updates
-            processed = 0
             for future in as_completed(futures):
                 symbol_id, result = future.result()
-                feature_calculation_status[calculation_id]["processed"] += 1
-                feature_calculation_status[calculation_id]["details"][symbol_id] = result
+                increment_feature_calculation_status(calculation_id, "processed")
+                set_feature_calculation_detail(calculation_id, symbol_id, result)
 
                 processed += 1
-                if processed % 5 == 0 or processed == len(symbol_ids):
-                    # Send progress update
+                now = time.monotonic()
+                if now - last_notified >= PROGRESS_NOTIFY_INTERVAL or processed == len(symbol_ids):
+                    # Send the latest progress at most once per interval
+                    last_notified = now
                     progress = (processed / len(symbol_ids)) * 100
-                    asyncio.create_task(notify_feature_calculation_status(calculation_id, "progress", {"processed": processed, "total": len(symbol_ids), "progress": progress}))
+                    enqueue_notification(notify_feature_calculation_status(calculation_id, "progress", {"processed": processed, "total": len(symbol_ids), "progress": progress, "elapsed_seconds": round(now - started_monotonic, 1)}))
 
                 if result["status"] == "success":
-                    feature_calculation_status[calculation_id]["successful"] += 1
+                    successful += 1
+                    increment_feature_calculation_status(calculation_id, "successful")
                 elif result["status"] == "error":
-                    feature_calculation_status[calculation_id]["errors"] += 1
+                    errors += 1
+                    increment_feature_calculation_status(calculation_id, "errors")
 
-        feature_calculation_status[calculation_id]["status"] = "completed"
-        feature_calculation_status[calculation_id]["completed_at"] = datetime.now().isoformat()
+        completed_at = datetime.now().isoformat()
+        update_feature_calculation_status(calculation_id, {"status": "completed", "completed_at": completed_at})
 
         # Send completion notification
-        asyncio.create_task(notify_feature_calculation_status(calculation_id, "completed", {"completed_at": feature_calculation_status[calculation_id]["completed_at"], "successful": feature_calculation_status[calculation_id]["successful"], "errors": feature_calculation_status[calculation_id]["errors"]}))
+        enqueue_notification(notify_feature_calculation_status(calculation_id, "completed", {"completed_at": completed_at, "successful": successful, "errors": errors}, timestamp=completed_at))
 
     except Exception as e:
-        feature_calculation_status[calculation_id].update({"status": "error", "completed_at": datetime.now().isoformat(), "error": str(e)})
+        completed_at = datetime.now().isoformat()
+        update_feature_calculation_status(calculation_id, {"status": "error", "completed_at": completed_at, "error": str(e)})
 
-        asyncio.create_task(notify_feature_calculation_status(calculation_id, "error", {"error": str(e)}))
+        enqueue_notification(notify_feature_calculation_status(calculation_id, "error", {"error": str(e)}, timestamp=completed_at))
 
         logger.error(f"Feature calculation task failed: {e}")
     finally:
@@ -312,7 +532,9 @@ async def run_feature_calculation_task(symbol_ids: Optional[List[int]] = None, a
     # Generate ID for tracking
     calculation_id = str(int(time.time()))
 
-    # Start the background process
-    run_feature_calculation_background(calculation_id, symbol_ids, active_only)
+    # Run the blocking calculation in a worker thread so the event loop stays free to deliver notifications
+    task = asyncio.create_task(asyncio.to_thread(run_feature_calculation_background, calculation_id, symbol_ids, active_only))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
     return calculation_id
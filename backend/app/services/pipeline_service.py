@@ -1,11 +1,20 @@
 # backend/app/services/pipeline_service.py
 
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import asyncio
+import json
 import logging
+import threading
+import time
 from app.core.logger import get_logger
+from app.core.event_loop import enqueue_notification
+from app.core.redis_client import RedisError, get_redis_client
+from app.utils.json_utils import dumps, encode_message
+from app.websockets.connection_manager import connection_manager
+from app.core.train.daily_trainer import train_models_for_tenant
+from app.core.predict.daily_predictor import predict_for_tenant
 
 logger = get_logger(__name__)
 
@@ -25,51 +34,112 @@ class PipelineStep:
     VERIFICATION = "verification"
 
 
-# In-memory tracking of pipeline status by tenant
-_pipeline_status = {}
+# Pipeline status by tenant: kept in Redis when configured so every worker sees the same state,
+# otherwise in process memory as (expires_at, status) guarded by a lock
+PIPELINE_STATUS_TTL = 60 * 60  # seconds
+_pipeline_status: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_pipeline_status_lock = threading.Lock()
+
+
+def _pipeline_status_key(tenant_id: int) -> str:
+    return f"pipeline:{tenant_id}"
+
+
+def _load_pipeline_status(tenant_id: int) -> Optional[Dict[str, Any]]:
+    """Read the stored pipeline status for a tenant, if any and not expired"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            payload = client.get(_pipeline_status_key(tenant_id))
+            return json.loads(payload) if payload else None
+        except RedisError as e:
+            logger.warning(f"Redis pipeline status read failed, using in-process state: {e}")
+
+    with _pipeline_status_lock:
+        entry = _pipeline_status.get(tenant_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _pipeline_status[tenant_id]
+            return None
+        return dict(entry[1])
+
+
+def _store_pipeline_status(tenant_id: int, state: Dict[str, Any]):
+    """Persist the pipeline status for a tenant with a TTL"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.set(_pipeline_status_key(tenant_id), dumps(state), ex=PIPELINE_STATUS_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis pipeline status update failed, using in-process state: {e}")
+
+    with _pipeline_status_lock:
+        _pipeline_status[tenant_id] = (time.monotonic() + PIPELINE_STATUS_TTL, state)
+
+
+def _pipeline_status_signature(state: Dict[str, Any]) -> Tuple:
+    """The parts of a pipeline status that clients are notified about"""
+    return (state.get("status"), state.get("current_step"), round(state.get("progress") or 0.0, 3), state.get("message"))
 
 
 def get_pipeline_status(tenant_id: int) -> Dict[str, Any]:
     """Get current pipeline status for a tenant"""
-    if tenant_id not in _pipeline_status:
+    state = _load_pipeline_status(tenant_id)
+    if state is None:
         return {"status": PipelineStatus.COMPLETED, "current_step": None, "progress": 1.0, "message": "No pipeline running", "started_at": None, "updated_at": None}
 
-    return _pipeline_status[tenant_id]
+    return state
+
+
+def update_pipeline_status(tenant_id: int, status: str, current_step: Optional[str] = None, progress: float = 0.0, message: str = "", previous: Optional[Dict[str, Any]] = None):
+    """
+    Update pipeline status and send notification.
 
+    Safe to call from sync code and worker threads: the notification is handed to the
+    main loop's queue instead of being started with asyncio.create_task. Callers that
+    already hold the last state (as returned here) pass it as previous to skip re-reading it.
+    """
+    if previous is None:
+        previous = _load_pipeline_status(tenant_id) or {}
+    now = datetime.now()
+    state = {"status": status, "current_step": current_step, "progress": progress, "message": message, "started_at": previous.get("started_at") or now, "updated_at": now}
+    _store_pipeline_status(tenant_id, state)
 
-def update_pipeline_status(tenant_id: int, status: str, current_step: Optional[str] = None, progress: float = 0.0, message: str = ""):
-    """Update pipeline status and send notification"""
-    _pipeline_status[tenant_id] = {"status": status, "current_step": current_step, "progress": progress, "message": message, "started_at": _pipeline_status.get(tenant_id, {}).get("started_at", datetime.now()), "updated_at": datetime.now()}
+    # Skip the broadcast when clients would see nothing new
+    if previous and _pipeline_status_signature(previous) == _pipeline_status_signature(state):
+        return state
 
     # Send WebSocket notification asynchronously
-    asyncio.create_task(notify_pipeline_status(tenant_id, status, progress, message))
+    enqueue_notification(notify_pipeline_status(tenant_id, status, progress, message, timestamp=now))
 
-    return _pipeline_status[tenant_id]
+    return state
 
 
-async def notify_pipeline_status(tenant_id: int, status: str, progress: float, message: str):
+async def notify_pipeline_status(tenant_id: int, status: str, progress: float, message: str, timestamp: Optional[datetime] = None):
     """Send notification about pipeline status via WebSocket"""
-    from app.websockets.connection_manager import connection_manager
-
-    # Format message
-    websocket_message = {"type": "pipeline_status", "timestamp": datetime.now().isoformat(), "data": {"status": status, "progress": progress, "message": message}, "tenant_id": tenant_id}
+    # Format message and encode it once for both broadcasts
+    websocket_message = {"type": "pipeline_status", "timestamp": timestamp or datetime.now(), "data": {"status": status, "progress": progress, "message": message}, "tenant_id": tenant_id}
+    payload = encode_message(websocket_message)
 
     # Send to pipeline topic
-    await connection_manager.broadcast(websocket_message, "pipeline")
+    await connection_manager.broadcast(payload, "pipeline")
 
     # Also send to tenant-specific channel
-    await connection_manager.broadcast_to_tenant(websocket_message, tenant_id)
+    await connection_manager.broadcast_to_tenant(payload, tenant_id)
 
 
 async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force: bool = False) -> Dict[str, Any]:
     """Run the data pipeline for a tenant"""
-    # Check if pipeline is already running
-    current_status = get_pipeline_status(tenant_id)
+    # Status reads and writes may hit Redis, so they run in worker threads to keep the loop free;
+    # the last written state is carried along instead of being read back before every update
+    current_status = await asyncio.to_thread(get_pipeline_status, tenant_id)
     if current_status["status"] == PipelineStatus.RUNNING and not force:
         return {"message": "Pipeline already running", "status": current_status["status"], "started_at": current_status["started_at"]}
 
     # Update status to running
-    update_pipeline_status(tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=None, progress=0.0, message="Pipeline started")
+    state = await asyncio.to_thread(update_pipeline_status, tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=None, progress=0.0, message="Pipeline started")
 
     try:
         # Determine steps to run
@@ -81,7 +151,7 @@ async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force:
         # For each step
         for step in pipeline_steps:
             # Update status with current step
-            update_pipeline_status(tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=step, progress=completed_steps / total_steps, message=f"Running step: {step}")
+            state = await asyncio.to_thread(update_pipeline_status, tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=step, progress=completed_steps / total_steps, message=f"Running step: {step}", previous=state)
 
             # Run the appropriate step function
             if step == PipelineStep.DATA_IMPORT:
@@ -98,11 +168,8 @@ async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force:
                 # Train tenant-specific models
                 logger.info(f"Model training step for tenant {tenant_id}")
                 # This would call the actual training function
-                from app.core.train.daily_trainer import train_models_for_tenant
-
-                # Run in thread to avoid blocking
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(None, lambda: train_models_for_tenant(tenant_id))
+                # Run in a worker thread to avoid blocking; pass the callable directly, no closure or context copy
+                result = await asyncio.get_running_loop().run_in_executor(None, train_models_for_tenant, tenant_id)
 
                 # Check result and log
                 success_count = sum(1 for r in result.values() if r.get("status") == "success")
@@ -113,11 +180,8 @@ async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force:
                 # Generate tenant-specific predictions
                 logger.info(f"Prediction generation step for tenant {tenant_id}")
                 # This would call the actual prediction function
-                from app.core.predict.daily_predictor import predict_for_tenant
-
-                # Run in thread to avoid blocking
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(None, lambda: predict_for_tenant(tenant_id))
+                # Run in a worker thread to avoid blocking
+                result = await asyncio.get_running_loop().run_in_executor(None, predict_for_tenant, tenant_id)
 
                 # Check result and log
                 success_count = sum(1 for success in result.values() if success)
@@ -131,10 +195,10 @@ async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force:
 
             # Update progress
             completed_steps += 1
-            update_pipeline_status(tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=step, progress=completed_steps / total_steps, message=f"Completed step: {step}")
+            state = await asyncio.to_thread(update_pipeline_status, tenant_id=tenant_id, status=PipelineStatus.RUNNING, current_step=step, progress=completed_steps / total_steps, message=f"Completed step: {step}", previous=state)
 
         # Update status to completed
-        update_pipeline_status(tenant_id=tenant_id, status=PipelineStatus.COMPLETED, current_step=None, progress=1.0, message="Pipeline completed successfully")
+        await asyncio.to_thread(update_pipeline_status, tenant_id=tenant_id, status=PipelineStatus.COMPLETED, current_step=None, progress=1.0, message="Pipeline completed successfully", previous=state)
 
         return {"message": "Pipeline completed successfully", "status": PipelineStatus.COMPLETED, "steps_executed": pipeline_steps}
 
@@ -142,6 +206,6 @@ async def run_pipeline(tenant_id: int, steps: Optional[List[str]] = None, force:
         logger.error(f"Pipeline error for tenant {tenant_id}: {str(e)}")
 
         # Update status to failed
-        update_pipeline_status(tenant_id=tenant_id, status=PipelineStatus.FAILED, current_step=None, progress=0.0, message=f"Pipeline failed: {str(e)}")
+        await asyncio.to_thread(update_pipeline_status, tenant_id=tenant_id, status=PipelineStatus.FAILED, current_step=None, progress=0.0, message=f"Pipeline failed: {str(e)}")
 
         return {"message": f"Pipeline failed: {str(e)}", "status": PipelineStatus.FAILED}
@@ -1,11 +1,13 @@
 # backend/app/services/prediction_service.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
+from sqlalchemy import func, insert, select
 from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any
+import numpy as np
 from app.db.models.prediction import Prediction, DirectionEnum
 from app.db.models.symbol import Symbol
+from app.db.models.eod_data import EODData
 from app.db.models.tenant import Tenant
 from app.db.models.user import User
 from app.schemas.prediction import PredictionRequest
@@ -13,9 +15,10 @@ from app.core.predict.daily_predictor import predict_for_one_symbol, predict_for
 from app.core.train.daily_trainer import train_model_for_symbol
 from app.schemas.prediction import PredictionFilter
 from app.core.logger import get_logger
-import asyncio
+from app.services.config_service import get_tenant_config
+from app.core.event_loop import enqueue_notification
+from app.utils.json_utils import encode_message
 from app.websockets.connection_manager import connection_manager
-import asyncio
 
 logger = get_logger(__name__)
 
@@ -24,16 +27,17 @@ prediction_task_status = {}
 
 async def notify_prediction_status(task_id: str, tenant_id: int, status: str, details: Dict[str, Any] = None):
     """Send WebSocket notification about prediction status"""
-    message = {"type": "prediction_status", "timestamp": datetime.now().isoformat(), "data": {"task_id": task_id, "status": status, **(details or {})}, "tenant_id": tenant_id}
+    message = {"type": "prediction_status", "timestamp": datetime.now(), "data": {"task_id": task_id, "status": status, **(details or {})}, "tenant_id": tenant_id}
+    payload = encode_message(message)
 
     # Broadcast to predictions topic
-    await connection_manager.broadcast(message, "predictions")
+    await connection_manager.broadcast(payload, "predictions")
 
     # Broadcast to task-specific topic
-    await connection_manager.broadcast(message, f"predictions_{task_id}")
+    await connection_manager.broadcast(payload, f"predictions_{task_id}")
 
     # Broadcast to tenant
-    await connection_manager.broadcast_to_tenant(message, tenant_id)
+    await connection_manager.broadcast_to_tenant(payload, tenant_id)
 
 
 def get_latest_prediction(db: Session, symbol_id: int, tenant_id: int) -> Optional[Prediction]:
@@ -67,12 +71,14 @@ def get_predictions_by_date(db: Session, tenant_id: int, filters: PredictionFilt
 
 def create_prediction(db: Session, tenant_id: int, symbol_id: int, data: Dict[str, Any]) -> Prediction:
     """Create a new prediction"""
-    # Create prediction object
-    prediction = Prediction(tenant_id=tenant_id, symbol_id=symbol_id, date=data.get("date", datetime.now().date()), strong_move_confidence=data.get("strong_move_confidence", 0.0), direction_prediction=data.get("direction_prediction"), direction_confidence=data.get("direction_confidence"), model_config_hash=data.get("model_config_hash", f"{tenant_id}_{datetime.now().date()}"))
+    values = {"tenant_id": tenant_id, "symbol_id": symbol_id, "date": data.get("date", datetime.now().date()), "strong_move_confidence": data.get("strong_move_confidence", 0.0), "direction_prediction": data.get("direction_prediction"), "direction_confidence": data.get("direction_confidence"), "model_config_hash": data.get("model_config_hash", f"{tenant_id}_{datetime.now().date()}")}
 
-    db.add(prediction)
+    # INSERT ... RETURNING loads server defaults (id, created_at) in the same round-trip
+    prediction = db.scalars(insert(Prediction).returning(Prediction), [values]).one()
+
+    # Detach before committing so the commit doesn't expire the returned attributes and force a reload
+    db.expunge(prediction)
     db.commit()
-    db.refresh(prediction)
 
     return prediction
 
@@ -98,122 +104,141 @@ def update_prediction_verification(db: Session, prediction_id: int, tenant_id: i
     return prediction
 
 
+# Unverified predictions are streamed and verified in batches of this size
+VERIFY_BATCH_SIZE = 1000
+
+# Plain-string direction values, resolved once instead of per comparison
+_UP = DirectionEnum.UP.value
+_DOWN = DirectionEnum.DOWN.value
+
+
+def _verify_prediction(pred, eod_data: List[Any], reference_price: float, threshold: float, max_days: int) -> Optional[Dict[str, Any]]:
+    """Work out the verification result for one prediction, or None if it can't be decided yet"""
+    # Calculate maximum up and down moves over the whole window at once
+    highs = np.fromiter((row.high for row in eod_data), dtype=np.float64, count=len(eod_data))
+    lows = np.fromiter((row.low for row in eod_data), dtype=np.float64, count=len(eod_data))
+    scale = 100.0 / reference_price
+
+    # Up move (high compared to reference)
+    up_pcts = (highs - reference_price) * scale
+    max_up_move = max(float(up_pcts.max()), 0.0)
+
+    # Down move (low compared to reference)
+    down_pcts = (lows - reference_price) * scale
+    max_down_move = min(float(down_pcts.min()), 0.0)
+
+    # Determine if prediction was verified
+    verified = False
+    verification_date = None
+    days_to_fulfill = None
+    actual_move_percent = None
+    actual_direction = None
+
+    if pred.direction_prediction == _UP and max_up_move >= threshold:
+        # Fulfilled on the first day the threshold was crossed, not the day of the peak
+        up_day = eod_data[int(np.argmax(up_pcts >= threshold))].date
+        verified = True
+        verification_date = up_day
+        days_to_fulfill = (up_day - pred.date).days
+        actual_move_percent = max_up_move
+        actual_direction = _UP
+
+    elif pred.direction_prediction == _DOWN and abs(max_down_move) >= threshold:
+        down_day = eod_data[int(np.argmax(down_pcts <= -threshold))].date
+        verified = True
+        verification_date = down_day
+        days_to_fulfill = (down_day - pred.date).days
+        actual_move_percent = max_down_move
+        actual_direction = _DOWN
+
+    elif max_up_move >= threshold or abs(max_down_move) >= threshold:
+        # Move happened but direction was wrong
+        verified = False
+        if max_up_move > abs(max_down_move):
+            actual_move_percent = max_up_move
+            actual_direction = _UP
+        else:
+            actual_move_percent = max_down_move
+            actual_direction = _DOWN
+
+    # Only record a result once verified or the whole window has elapsed
+    if not verified and len(eod_data) < max_days:
+        return None
+
+    return {"id": pred.id, "verified": verified, "verification_date": verification_date, "actual_move_percent": actual_move_percent, "actual_direction": actual_direction, "days_to_fulfill": days_to_fulfill}
+
+
 def verify_predictions(db: Session, tenant_id: int) -> int:
     """
     Verify unverified predictions against actual price movements.
     Returns count of predictions updated.
     """
-    # Get unverified predictions
-    unverified = db.query(Prediction).filter(Prediction.tenant_id == tenant_id, Prediction.verified == False, Prediction.date < datetime.now().date() - timedelta(days=1)).all()
-
-    updated_count = 0
-
     # Get threshold from tenant's config
-    from app.services.config_service import get_tenant_config
-
     threshold = get_tenant_config(db, tenant_id, "STRONG_MOVE_THRESHOLD")
     threshold = float(threshold) if threshold else 3.0
 
     max_days = get_tenant_config(db, tenant_id, "MAX_DAYS")
     max_days = int(max_days) if max_days else 5
 
-    for pred in unverified:
-        # Get historical prices after prediction date
-        prices = db.query(Symbol.trading_symbol, Symbol.exchange).filter(Symbol.id == pred.symbol_id).first()
+    # Stream unverified predictions through a server-side cursor so memory stays bounded by the batch size
+    unverified_query = select(Prediction.id, Prediction.date, Prediction.direction_prediction).where(Prediction.tenant_id == tenant_id, Prediction.verified == False, Prediction.date < datetime.now().date() - timedelta(days=1)).order_by(Prediction.id).execution_options(yield_per=VERIFY_BATCH_SIZE)
 
-        if not prices:
-            logger.warning(f"Symbol {pred.symbol_id} not found for prediction {pred.id}")
-            continue
+    updated_count = 0
 
-        # Get EOD prices after prediction date
-        from app.db.models.eod_data import EODData
+    for batch in db.execute(unverified_query).partitions():
+        batch_ids = [pred.id for pred in batch]
 
-        eod_data = db.query(EODData).filter(EODData.symbol_id == pred.symbol_id, EODData.date > pred.date, EODData.date <= pred.date + timedelta(days=max_days)).order_by(EODData.date.asc()).all()
+        # Reference prices (close on prediction date) for the whole batch in one query
+        reference_prices = dict(db.execute(select(Prediction.id, EODData.close).join(EODData, (EODData.symbol_id == Prediction.symbol_id) & (EODData.date == Prediction.date)).where(Prediction.id.in_(batch_ids))).all())
 
-        if not eod_data:
-            logger.warning(f"No EOD data found for verification of prediction {pred.id}")
-            continue
+        # EOD windows (pred.date, pred.date + max_days] for the whole batch in one query
+        eod_windows: Dict[int, List[Any]] = {}
+        window_query = select(Prediction.id, EODData.date, EODData.high, EODData.low).join(EODData, (EODData.symbol_id == Prediction.symbol_id) & (EODData.date > Prediction.date) & (EODData.date <= Prediction.date + max_days)).where(Prediction.id.in_(batch_ids)).order_by(Prediction.id, EODData.date)
+        for row in db.execute(window_query):
+            eod_windows.setdefault(row.id, []).append(row)
 
-        # Get reference price (close on prediction date)
-        reference_price = db.query(EODData.close).filter(EODData.symbol_id == pred.symbol_id, EODData.date == pred.date).scalar()
+        updates: List[Dict[str, Any]] = []
 
-        if not reference_price:
-            logger.warning(f"No reference price for prediction {pred.id}")
-            continue
+        for pred in batch:
+            eod_data = eod_windows.get(pred.id)
 
-        # Calculate maximum up and down moves
-        max_up_move, max_down_move = 0, 0
-        up_day, down_day = None, None
+            if not eod_data:
+                logger.warning(f"No EOD data found for verification of prediction {pred.id}")
+                continue
 
-        for price in eod_data:
-            # Calculate up move (high compared to reference)
-            up_pct = ((price.high - reference_price) / reference_price) * 100
-            if up_pct > max_up_move:
-                max_up_move = up_pct
-                up_day = price.date
+            reference_price = reference_prices.get(pred.id)
 
-            # Calculate down move (low compared to reference)
-            down_pct = ((price.low - reference_price) / reference_price) * 100
-            if down_pct < max_down_move:
-                max_down_move = down_pct
-                down_day = price.date
+            if not reference_price:
+                logger.warning(f"No reference price for prediction {pred.id}")
+                continue
 
-        # Determine if prediction was verified
-        verified = False
-        verification_date = None
-        days_to_fulfill = None
-        actual_move_percent = None
-        actual_direction = None
-
-        if pred.direction_prediction == DirectionEnum.UP and max_up_move >= threshold:
-            verified = True
-            verification_date = up_day
-            days_to_fulfill = (up_day - pred.date).days
-            actual_move_percent = max_up_move
-            actual_direction = DirectionEnum.UP
+            update = _verify_prediction(pred, eod_data, reference_price, threshold, max_days)
+            if update:
+                updates.append(update)
 
-        elif pred.direction_prediction == DirectionEnum.DOWN and abs(max_down_move) >= threshold:
-            verified = True
-            verification_date = down_day
-            days_to_fulfill = (down_day - pred.date).days
-            actual_move_percent = max_down_move
-            actual_direction = DirectionEnum.DOWN
-
-        elif max_up_move >= threshold or abs(max_down_move) >= threshold:
-            # Move happened but direction was wrong
-            verified = False
-            if max_up_move > abs(max_down_move):
-                actual_move_percent = max_up_move
-                actual_direction = DirectionEnum.UP
-            else:
-                actual_move_percent = max_down_move
-                actual_direction = DirectionEnum.DOWN
-
-        # Update prediction record
-        if verified or len(eod_data) >= max_days:
-            pred.verified = verified
-            pred.verification_date = verification_date
-            pred.actual_move_percent = actual_move_percent
-            pred.actual_direction = actual_direction
-            pred.days_to_fulfill = days_to_fulfill
-            updated_count += 1
+        # Write the batch's results as one executemany UPDATE keyed by primary key
+        if updates:
+            db.bulk_update_mappings(Prediction, updates)
+            updated_count += len(updates)
+
+    # Commit once at the end; committing mid-stream would close the server-side cursor
+    if updated_count:
+        db.commit()
 
-    db.commit()
     return updated_count
 
 
 async def notify_new_prediction(tenant_id: int, symbol_id: int, prediction_data: Dict[str, Any]):
     """Send notification about a new prediction via WebSocket"""
-    from app.websockets.connection_manager import connection_manager
-
     # Format message
-    message = {"type": "prediction", "timestamp": datetime.now().isoformat(), "data": {"tenant_id": tenant_id, "symbol_id": symbol_id, "prediction": prediction_data}, "tenant_id": tenant_id}
+    message = {"type": "prediction", "timestamp": datetime.now(), "data": {"tenant_id": tenant_id, "symbol_id": symbol_id, "prediction": prediction_data}, "tenant_id": tenant_id}
+    payload = encode_message(message)
 
     # Send to all clients in predictions topic
-    await connection_manager.broadcast(message, "predictions")
+    await connection_manager.broadcast(payload, "predictions")
 
     # Also send to tenant-specific channel
-    await connection_manager.broadcast_to_tenant(message, tenant_id)
+    await connection_manager.broadcast_to_tenant(payload, tenant_id)
 
 
 def refresh_prediction(db: Session, tenant_id: int, symbol_id: int, force_retrain: bool = False) -> Optional[Prediction]:
@@ -251,44 +276,46 @@ def refresh_prediction(db: Session, tenant_id: int, symbol_id: int, force_retrai
         try:
             prediction_dict = {"date": new_prediction.date.isoformat(), "strong_move_confidence": new_prediction.strong_move_confidence, "direction_prediction": new_prediction.direction_prediction, "direction_confidence": new_prediction.direction_confidence}
 
-            # Use create_task to run this asynchronously without blocking
-            asyncio.create_task(notify_new_prediction(tenant_id, symbol_id, prediction_dict))
+            # Queue the notification so it runs without blocking
+            enqueue_notification(notify_new_prediction(tenant_id, symbol_id, prediction_dict))
         except Exception as e:
             logger.error(f"WebSocket broadcast error: {str(e)}")
 
     return new_prediction
 
 
-def get_prediction_stats(db: Session, tenant_id: int, symbol_id: Optional[int] = None) -> Dict[str, Any]:
-    """Get prediction accuracy statistics for a tenant"""
-    # Build query
-    query = db.query(Prediction).filter(Prediction.tenant_id == tenant_id)
+def get_prediction_stats(db: Session, tenant_id: int, symbol_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+    """Get prediction accuracy statistics for a tenant, shaped like the PredictionStats schema"""
+    is_verified = Prediction.verified == True
+    has_direction = is_verified & (Prediction.direction_prediction != "") & (Prediction.actual_direction != "")
 
-    # Add symbol filter if provided
-    if symbol_id:
-        query = query.filter(Prediction.symbol_id == symbol_id)
+    # Compute every metric in a single aggregate query
+    query = db.query(
+        func.count(Prediction.id).label("total"),
+        func.count(Prediction.id).filter(is_verified).label("verified"),
+        func.count(Prediction.id).filter(Prediction.direction_prediction == _UP).label("up"),
+        func.count(Prediction.id).filter(Prediction.direction_prediction == _DOWN).label("down"),
+        func.count(Prediction.id).filter(has_direction).label("with_direction"),
+        func.count(Prediction.id).filter(has_direction & (Prediction.direction_prediction == Prediction.actual_direction)).label("direction_correct"),
+        func.avg(Prediction.days_to_fulfill).filter(is_verified & (Prediction.days_to_fulfill != 0)).label("avg_days"),
+    ).filter(Prediction.tenant_id == tenant_id)
 
-    # Execute query
-    predictions = query.all()
+    if start_date:
+        query = query.filter(Prediction.date >= start_date)
 
-    # Calculate metrics
-    total_count = len(predictions)
-    if total_count == 0:
-        return {"total_predictions": 0, "verified_predictions": 0, "accuracy": 0.0, "up_predictions": 0, "down_predictions": 0}
+    if end_date:
+        query = query.filter(Prediction.date <= end_date)
 
-    verified_count = sum(1 for p in predictions if p.verified)
-    up_count = sum(1 for p in predictions if p.direction_prediction == DirectionEnum.UP)
-    down_count = sum(1 for p in predictions if p.direction_prediction == DirectionEnum.DOWN)
+    # Add symbol filter if provided
+    if symbol_id:
+        query = query.filter(Prediction.symbol_id == symbol_id)
 
-    # Direction accuracy - only for predictions with direction
-    direction_predictions = [p for p in predictions if p.direction_prediction and p.actual_direction]
-    direction_correct = sum(1 for p in direction_predictions if p.verified and p.direction_prediction == p.actual_direction)
+    stats = query.one()
 
-    # Days to fulfill
-    days_to_fulfill = [p.days_to_fulfill for p in predictions if p.verified and p.days_to_fulfill]
-    avg_days = sum(days_to_fulfill) / len(days_to_fulfill) if days_to_fulfill else None
+    total_count = stats.total
+    avg_days = float(stats.avg_days) if stats.avg_days is not None else None
 
-    return {"totalPredictions": total_count, "verifiedPredictions": verified_count, "accuracy": verified_count / total_count if total_count > 0 else 0.0, "upPredictions": up_count, "downPredictions": down_count, "directionAccuracy": direction_correct / len(direction_predictions) if direction_predictions else None, "avgDaysToFulfill": avg_days}
+    return {"total_predictions": total_count, "verified_predictions": stats.verified, "accuracy": stats.verified / total_count if total_count > 0 else 0.0, "up_predictions": stats.up, "down_predictions": stats.down, "direction_accuracy": stats.direction_correct / stats.with_direction if stats.with_direction else None, "avg_days_to_fulfill": avg_days}
 
 
 def get_accuracy_trend(db: Session, tenant_id: int, lookback_days: int = 7, symbol_id: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -298,38 +325,28 @@ def get_accuracy_trend(db: Session, tenant_id: int, lookback_days: int = 7, symb
     start_date = end_date - timedelta(days=lookback_days * 2)  # Double to account for weekends/holidays
 
     # Base query grouping by date
-    query = db.query(Prediction.date, func.count(Prediction.id).label("total"), func.sum(func.cast(Prediction.verified == True, Integer)).label("correct")).filter(Prediction.tenant_id == tenant_id, Prediction.date >= start_date, Prediction.date <= end_date)
+    query = db.query(Prediction.date, func.count(Prediction.id).label("total"), func.count(Prediction.id).filter(Prediction.verified == True).label("correct")).filter(Prediction.tenant_id == tenant_id, Prediction.date >= start_date, Prediction.date <= end_date)
 
     # Add symbol filter if provided
     if symbol_id:
         query = query.filter(Prediction.symbol_id == symbol_id)
 
-    # Group by date and order by date
-    query = query.group_by(Prediction.date).order_by(Prediction.date)
+    # Group by date and keep only the most recent lookback_days dates
+    results = query.group_by(Prediction.date).order_by(Prediction.date.desc()).limit(lookback_days).all()
 
-    results = query.all()
-
-    # Format for chart display
+    # Format for chart display, oldest first
     trend_data = []
-    for result in results:
-        # Skip days with zero predictions
-        if result.total == 0:
-            continue
-
-        accuracy = (result.correct / result.total) if result.total > 0 else 0
+    for result in reversed(results):
+        accuracy = result.correct / result.total
         trend_data.append({"date": result.date.isoformat(), "total": result.total, "correct": result.correct, "accuracy": round(accuracy, 4)})
 
-    # Limit to requested lookback period
-    if len(trend_data) > lookback_days:
-        trend_data = trend_data[-lookback_days:]
-
     return trend_data
 
 
 async def predict_for_tenant_with_notifications(tenant_id: int, request: Optional[PredictionRequest] = None, current_user: Optional[User] = None, task_id: str = None):
     """Generate predictions for symbols with WebSocket notifications"""
     # Send initial notification
-    asyncio.create_task(notify_prediction_status(task_id, tenant_id, "started", {"message": "Starting prediction generation"}))
+    enqueue_notification(notify_prediction_status(task_id, tenant_id, "started", {"message": "Starting prediction generation"}))
 
     try:
         # Call the original function
@@ -343,7 +360,7 @@ async def predict_for_tenant_with_notifications(tenant_id: int, request: Optiona
         prediction_task_status[task_id] = {"status": "completed", "completed_at": datetime.now().isoformat(), "success_count": success_count, "total_count": total_count, "tenant_id": tenant_id}
 
         # Send completion notification
-        asyncio.create_task(notify_prediction_status(task_id, tenant_id, "completed", {"success_count": success_count, "total_count": total_count, "message": f"Completed generating predictions: {success_count}/{total_count} successful"}))
+        enqueue_notification(notify_prediction_status(task_id, tenant_id, "completed", {"success_count": success_count, "total_count": total_count, "message": f"Completed generating predictions: {success_count}/{total_count} successful"}))
 
         return results
 
@@ -352,7 +369,7 @@ async def predict_for_tenant_with_notifications(tenant_id: int, request: Optiona
         prediction_task_status[task_id] = {"status": "failed", "error": str(e), "completed_at": datetime.now().isoformat(), "tenant_id": tenant_id}
 
         # Send error notification
-        asyncio.create_task(notify_prediction_status(task_id, tenant_id, "failed", {"error": str(e), "message": f"Prediction generation failed: {str(e)}"}))
+        enqueue_notification(notify_prediction_status(task_id, tenant_id, "failed", {"error": str(e), "message": f"Prediction generation failed: {str(e)}"}))
         logger.error(f"Prediction generation failed: {e}")
 
         return {}
@@ -1,24 +1,40 @@
 # app/services/symbol_service.py
+import asyncio
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from sqlalchemy import func, or_
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from sqlalchemy import String, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.db.models.symbol import Symbol
 from app.db.models.tenant_symbol import TenantSymbol
 from app.db.models.tenant import Tenant
+from app.db.session import SessionLocal
+from app.utils.pagination import decode_cursor, next_cursor
 
 
 # Symbol Access (All Users)
-def get_symbols(db: Session, active_only: bool = True, fo_eligible: Optional[bool] = None, skip: int = 0, limit: int = 100) -> List[Symbol]:
-    """Get all symbols with optional filtering"""
+def get_symbols(db: Session, active_only: bool = True, fo_eligible: Optional[bool] = None, limit: Optional[int] = 100, cursor: Optional[str] = None) -> Tuple[List[Symbol], Optional[str]]:
+    """
+    Get symbols with optional filtering, ordered by trading symbol.
+
+    Pages are keyset-paginated on (trading_symbol, id): pass the returned cursor back to get
+    the next page. Returns the symbols and the next cursor (None on the last page).
+    """
     query = db.query(Symbol)
 
     if active_only:
-        query = query.filter(Symbol.active == True)
+        query = query.filter(Symbol.active)
 
     if fo_eligible is not None:
         query = query.filter(Symbol.fo_eligible == fo_eligible)
 
-    return query.order_by(Symbol.trading_symbol).offset(skip).limit(limit).all()
+    if cursor:
+        after_trading_symbol, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Symbol.trading_symbol, Symbol.id) > tuple_(after_trading_symbol, after_id))
+
+    symbols = query.order_by(Symbol.trading_symbol, Symbol.id).limit(limit).all()
+
+    return symbols, next_cursor(symbols, limit, "trading_symbol", "id")
 
 
 def get_symbol_by_id(db: Session, symbol_id: int) -> Optional[Symbol]:
@@ -31,7 +47,7 @@ def search_symbols(db: Session, search_term: str, active_only: bool = True) -> L
     query = db.query(Symbol)
 
     if active_only:
-        query = query.filter(Symbol.active == True)
+        query = query.filter(Symbol.active)
 
     search_pattern = f"%{search_term}%"
     query = query.filter(or_(Symbol.trading_symbol.ilike(search_pattern), Symbol.name.ilike(search_pattern)))
@@ -42,69 +58,74 @@ def search_symbols(db: Session, search_term: str, active_only: bool = True) -> L
 # Watchlist Management
 def get_tenant_watchlist(db: Session, tenant_id: int, active_only: bool = True, fo_eligible = False) -> List[Dict[str, Any]]:
     """Get symbols in tenant's watchlist"""
-    query = db.query(Symbol, TenantSymbol).join(TenantSymbol, Symbol.id == TenantSymbol.symbol_id).filter(TenantSymbol.tenant_id == tenant_id)
+    # Select only the columns we return; no ORM entities are built for this read-only path
+    stmt = select(Symbol.id.label("symbol_id"), Symbol.trading_symbol, Symbol.name, Symbol.exchange, Symbol.fo_eligible, TenantSymbol.id.label("watchlist_id"), TenantSymbol.priority, TenantSymbol.notes, TenantSymbol.created_at.label("added_at")).join(TenantSymbol, Symbol.id == TenantSymbol.symbol_id).where(TenantSymbol.tenant_id == tenant_id)
 
     if active_only:
-        query = query.filter(Symbol.active == True, TenantSymbol.is_active == True)
-    
-    if fo_eligible:
-        query = query.filter(Symbol.fo_eligible)
+        stmt = stmt.where(Symbol.active, TenantSymbol.is_active)
 
-    query = query.order_by(TenantSymbol.priority.desc(), Symbol.trading_symbol)
+    if fo_eligible:
+        stmt = stmt.where(Symbol.fo_eligible)
 
-    result = []
-    for symbol, tenant_symbol in query.all():
-        result.append({"symbol_id": symbol.id, "trading_symbol": symbol.trading_symbol, "name": symbol.name, "exchange": symbol.exchange, "fo_eligible": symbol.fo_eligible, "watchlist_id": tenant_symbol.id, "priority": tenant_symbol.priority, "notes": tenant_symbol.notes, "added_at": tenant_symbol.created_at})
+    stmt = stmt.order_by(TenantSymbol.priority.desc(), Symbol.trading_symbol)
 
-    return result
+    return [dict(row) for row in db.execute(stmt).mappings()]
 
 
 def add_to_watchlist(db: Session, tenant_id: int, symbol_id: int, priority: int = 0, notes: Optional[str] = None) -> Dict[str, Any]:
-    """Add symbol to tenant's watchlist with plan limit check"""
-    # Check if symbol exists
-    symbol = db.query(Symbol).filter(Symbol.id == symbol_id, Symbol.active == True).first()
-    if not symbol:
-        return {"success": False, "message": "Symbol not found or inactive"}
+    """
+    Add symbol to tenant's watchlist with plan limit check.
+
+    The symbol check, plan limit check and insert (or reactivation of an inactive entry) run as a
+    single INSERT ... SELECT ... ON CONFLICT statement. Only when nothing was written is a second
+    query issued to work out why.
+    """
+    # Active watchlist size, checked against the tenant's plan limit inside the insert
+    active_count = select(func.count(TenantSymbol.id)).where(TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active).correlate(None).scalar_subquery()
+    source = select(literal(tenant_id), Symbol.id, literal(True), literal(priority), literal(notes, String)).join(Tenant, Tenant.id == tenant_id).where(Symbol.id == symbol_id, Symbol.active, or_(Tenant.max_symbols.is_(None), active_count < Tenant.max_symbols))
+
+    stmt = pg_insert(TenantSymbol).from_select(["tenant_id", "symbol_id", "is_active", "priority", "notes"], source)
+    stmt = stmt.on_conflict_do_update(constraint="unique_tenant_symbol", set_={"is_active": True, "priority": stmt.excluded.priority, "notes": stmt.excluded.notes, "updated_at": func.now()}, where=~TenantSymbol.is_active)
+    # xmax is 0 for freshly inserted rows and non-zero for rows updated by ON CONFLICT
+    stmt = stmt.returning(TenantSymbol.id, literal_column("(xmax = 0)").label("inserted"))
+
+    row = db.execute(stmt).first()
+    if row is None:
+        return _watchlist_add_failure(db, tenant_id, symbol_id)
 
-    # Check if symbol is already in watchlist
-    existing = db.query(TenantSymbol).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id).first()
-
-    if existing:
-        if existing.is_active:
-            return {"success": False, "message": "Symbol already in watchlist"}
-        else:
-            # Reactivate existing entry
-            existing.is_active = True
-            existing.priority = priority
-            existing.notes = notes
-            db.commit()
-            return {"success": True, "message": "Symbol reactivated in watchlist"}
-
-    # Check plan limits
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
-        return {"success": False, "message": "Tenant not found"}
+    db.commit()
 
-    # Count active symbols in watchlist
-    active_count = db.query(func.count(TenantSymbol.id)).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active == True).scalar()
+    if not row.inserted:
+        return {"success": True, "message": "Symbol reactivated in watchlist"}
 
-    # Check if adding would exceed limit
-    if tenant.max_symbols is not None and active_count >= tenant.max_symbols:
-        return {"success": False, "message": f"Plan limit reached. Maximum {tenant.max_symbols} symbols allowed."}
+    return {"success": True, "message": "Symbol added to watchlist", "watchlist_id": row.id}
 
-    # Add to watchlist
-    tenant_symbol = TenantSymbol(tenant_id=tenant_id, symbol_id=symbol_id, is_active=True, priority=priority, notes=notes)
-    db.add(tenant_symbol)
-    db.commit()
-    db.refresh(tenant_symbol)
 
-    return {"success": True, "message": "Symbol added to watchlist", "watchlist_id": tenant_symbol.id}
+def _watchlist_add_failure(db: Session, tenant_id: int, symbol_id: int) -> Dict[str, Any]:
+    """Explain why add_to_watchlist did not write a row"""
+    symbol_ok = select(Symbol.id).where(Symbol.id == symbol_id, Symbol.active).exists()
+    in_watchlist = select(TenantSymbol.id).where(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id, TenantSymbol.is_active).exists()
+    tenant_exists = select(Tenant.id).where(Tenant.id == tenant_id).exists()
+    max_symbols = select(Tenant.max_symbols).where(Tenant.id == tenant_id).scalar_subquery()
+
+    state = db.execute(select(symbol_ok.label("symbol_ok"), in_watchlist.label("in_watchlist"), tenant_exists.label("tenant_exists"), max_symbols.label("max_symbols"))).one()
+
+    if not state.symbol_ok:
+        return {"success": False, "message": "Symbol not found or inactive"}
+
+    if state.in_watchlist:
+        return {"success": False, "message": "Symbol already in watchlist"}
+
+    if not state.tenant_exists:
+        return {"success": False, "message": "Tenant not found"}
+
+    return {"success": False, "message": f"Plan limit reached. Maximum {state.max_symbols} symbols allowed."}
 
 
 def remove_from_watchlist(db: Session, tenant_id: int, symbol_id: int) -> Dict[str, bool]:
     """Remove symbol from tenant's watchlist"""
     # Find the entry
-    entry = db.query(TenantSymbol).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id, TenantSymbol.is_active == True).first()
+    entry = db.query(TenantSymbol).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id, TenantSymbol.is_active).first()
 
     if not entry:
         return {"success": False, "message": "Symbol not found in watchlist"}
@@ -118,28 +139,27 @@ def remove_from_watchlist(db: Session, tenant_id: int, symbol_id: int) -> Dict[s
 
 def get_watchlist_usage(db: Session, tenant_id: int) -> Dict[str, Any]:
     """Get watchlist usage statistics"""
-    tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-    if not tenant:
+    # Plan limit and active watchlist size in one round trip
+    used = select(func.count(TenantSymbol.id)).where(TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active).scalar_subquery()
+    row = db.execute(select(Tenant.max_symbols, used.label("used")).where(Tenant.id == tenant_id)).first()
+    if not row:
         return {"success": False, "message": "Tenant not found"}
 
-    total_count = db.query(func.count(TenantSymbol.id)).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active == True).scalar()
-
-    max_allowed = tenant.max_symbols
+    total_count = row.used
+    max_allowed = row.max_symbols
 
     return {"success": True, "used": total_count, "max_allowed": max_allowed, "available": (max_allowed - total_count) if max_allowed is not None else None, "unlimited": max_allowed is None}
 
 
 def check_symbol_in_watchlist(db: Session, tenant_id: int, symbol_id: int) -> bool:
     """Check if a symbol is in tenant's watchlist (for other services)"""
-    entry = db.query(TenantSymbol).filter(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id, TenantSymbol.is_active == True).first()
-
-    return entry is not None
+    return db.scalar(select(TenantSymbol.id).where(TenantSymbol.tenant_id == tenant_id, TenantSymbol.symbol_id == symbol_id, TenantSymbol.is_active).exists().select())
 
 
 def update_watchlist_item(db: Session, tenant_id: int, watchlist_id: int, priority: Optional[int] = None, notes: Optional[str] = None) -> Dict[str, Any]:
     """Update a watchlist item's properties"""
     # Find the entry
-    entry = db.query(TenantSymbol).filter(TenantSymbol.id == watchlist_id, TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active == True).first()
+    entry = db.query(TenantSymbol).filter(TenantSymbol.id == watchlist_id, TenantSymbol.tenant_id == tenant_id, TenantSymbol.is_active).first()
 
     if not entry:
         return {"success": False, "message": "Watchlist item not found"}
@@ -156,37 +176,40 @@ def update_watchlist_item(db: Session, tenant_id: int, watchlist_id: int, priori
     return {"success": True, "message": "Watchlist item updated", "watchlist_id": entry.id}
 
 
-def get_symbols_with_stats(db: Session) -> Dict[str, Any]:
-    """Get system-wide symbol statistics for admin dashboard"""
-    # Total symbols
-    total_symbols = db.query(func.count(Symbol.id)).scalar()
+def _symbol_counts(db: Session) -> Dict[str, Any]:
+    """Total, active, F&O eligible and recently updated (last 7 days) symbols in one scan, plus symbols in watchlists"""
+    one_week_ago = datetime.now() - timedelta(days=7)
+    watchlist_count_subquery = select(func.count(func.distinct(TenantSymbol.symbol_id))).where(TenantSymbol.is_active).scalar_subquery()
+    return dict(db.execute(select(func.count(Symbol.id).label("total"), func.count(Symbol.id).filter(Symbol.active).label("active"), func.count(Symbol.id).filter(Symbol.fo_eligible).label("fo_eligible"), func.count(Symbol.id).filter(Symbol.updated_at >= one_week_ago).label("recent"), watchlist_count_subquery.label("in_watchlists"))).mappings().one())
 
-    # Active symbols
-    active_symbols = db.query(func.count(Symbol.id)).filter(Symbol.active == True).scalar()
 
-    # Inactive symbols
-    inactive_symbols = total_symbols - active_symbols
+def _exchange_counts(db: Session) -> Dict[str, int]:
+    """Symbols by exchange"""
+    return dict(db.execute(select(Symbol.exchange, func.count(Symbol.id)).group_by(Symbol.exchange)).all())
 
-    # F&O eligible symbols
-    fo_eligible_count = db.query(func.count(Symbol.id)).filter(Symbol.fo_eligible == True).scalar()
 
-    # Symbols by exchange
-    exchange_counts = {}
-    for exchange, count in db.query(Symbol.exchange, func.count(Symbol.id)).group_by(Symbol.exchange).all():
-        exchange_counts[exchange] = count
+def _popular_symbols(db: Session) -> List[Dict[str, Any]]:
+    """Most popular symbols in watchlists"""
+    stmt = select(Symbol.id.label("symbol_id"), Symbol.trading_symbol, Symbol.name, func.count(TenantSymbol.id).label("watchlist_count")).join(TenantSymbol, Symbol.id == TenantSymbol.symbol_id).where(TenantSymbol.is_active).group_by(Symbol.id, Symbol.trading_symbol, Symbol.name).order_by(func.count(TenantSymbol.id).desc()).limit(10)
+    return [dict(row) for row in db.execute(stmt).mappings()]
 
-    # Recently updated symbols (last 7 days)
-    from datetime import datetime, timedelta
 
-    one_week_ago = datetime.now() - timedelta(days=7)
-    recent_updates = db.query(func.count(Symbol.id)).filter(Symbol.updated_at >= one_week_ago).scalar()
+def _run_in_own_session(query: Callable[[Session], Any]) -> Any:
+    """Run a read-only query function on its own pooled connection"""
+    db = SessionLocal()
+    try:
+        return query(db)
+    finally:
+        db.close()
 
-    # Symbols in watchlists
-    watchlist_count = db.query(func.count(func.distinct(TenantSymbol.symbol_id))).filter(TenantSymbol.is_active == True).scalar()
 
-    # Most popular symbols in watchlists
-    popular_symbols_query = db.query(Symbol.id, Symbol.trading_symbol, Symbol.name, func.count(TenantSymbol.id).label("watchlist_count")).join(TenantSymbol, Symbol.id == TenantSymbol.symbol_id).filter(TenantSymbol.is_active == True).group_by(Symbol.id, Symbol.trading_symbol, Symbol.name).order_by(func.count(TenantSymbol.id).desc()).limit(10)
+async def get_symbols_with_stats() -> Dict[str, Any]:
+    """
+    Get system-wide symbol statistics for admin dashboard.
 
-    popular_symbols = [{"symbol_id": s.id, "trading_symbol": s.trading_symbol, "name": s.name, "watchlist_count": s.watchlist_count} for s in popular_symbols_query.all()]
+    The three independent queries run concurrently in worker threads, each on its own session,
+    so the endpoint takes as long as the slowest query rather than the sum.
+    """
+    counts, exchange_counts, popular_symbols = await asyncio.gather(*(asyncio.to_thread(_run_in_own_session, query) for query in (_symbol_counts, _exchange_counts, _popular_symbols)))
 
-    return {"total_symbols": total_symbols, "active_symbols": active_symbols, "inactive_symbols": inactive_symbols, "fo_eligible_count": fo_eligible_count, "symbols_by_exchange": exchange_counts, "recent_updates": recent_updates, "watchlist_usage": {"total_symbols_in_watchlists": watchlist_count, "popular_symbols": popular_symbols}}
+    return {"total_symbols": counts["total"], "active_symbols": counts["active"], "inactive_symbols": counts["total"] - counts["active"], "fo_eligible_count": counts["fo_eligible"], "symbols_by_exchange": exchange_counts, "recent_updates": counts["recent"], "watchlist_usage": {"total_symbols_in_watchlists": counts["in_watchlists"], "popular_symbols": popular_symbols}}
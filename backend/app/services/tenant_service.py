@@ -1,6 +1,7 @@
 # backend/app/services/tenant_service.py
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.core.caches import tenant_cache
 from app.db.models.tenant import Tenant
 from app.schemas.tenant import TenantCreate, TenantUpdate
 from fastapi import HTTPException, status
@@ -17,9 +18,14 @@ def get_tenant_by_slug(db: Session, slug: str) -> Optional[Tenant]:
     return db.query(Tenant).filter(Tenant.slug == slug).first()
 
 
-def get_tenants(db: Session, skip: int = 0, limit: int = 100) -> List[Tenant]:
-    """Get all tenants with pagination"""
-    return db.query(Tenant).offset(skip).limit(limit).all()
+def get_tenants(db: Session, after_id: Optional[int] = None, limit: int = 100) -> List[Tenant]:
+    """Get all tenants ordered by ID, starting after after_id (keyset pagination)"""
+    query = db.query(Tenant)
+
+    if after_id is not None:
+        query = query.filter(Tenant.id > after_id)
+
+    return query.order_by(Tenant.id).limit(limit).all()
 
 
 def create_tenant(db: Session, tenant: TenantCreate) -> Tenant:
@@ -33,13 +39,13 @@ def create_tenant(db: Session, tenant: TenantCreate) -> Tenant:
     db_tenant = Tenant(name=tenant.name, slug=tenant.slug, plan=tenant.plan, max_symbols=tenant.max_symbols, is_active=True)
 
     db.add(db_tenant)
-    db.commit()
-    db.refresh(db_tenant)
+    db.flush()
 
-    # Initialize default config for the tenant
+    # Initialize default config for the tenant; commits the tenant and its config together
     from app.services.config_service import initialize_tenant_config
 
     initialize_tenant_config(db, db_tenant.id)
+    db.refresh(db_tenant)
 
     return db_tenant
 
@@ -51,11 +57,15 @@ def update_tenant(db: Session, tenant_id: int, tenant_data: TenantUpdate) -> Opt
         return None
 
     # Update tenant fields
+    previous_slug = db_tenant.slug
     update_data = tenant_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_tenant, key, value)
 
     db.commit()
+    tenant_cache.pop(previous_slug)
+    tenant_cache.pop(db_tenant.slug)
+
     db.refresh(db_tenant)
     return db_tenant
 
@@ -68,4 +78,5 @@ def delete_tenant(db: Session, tenant_id: int) -> bool:
 
     db_tenant.is_active = False
     db.commit()
+    tenant_cache.pop(db_tenant.slug)
     return True
@@ -1,7 +1,9 @@
 # backend/app/services/user_service.py
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, load_only
 from typing import List, Optional
 from fastapi import HTTPException, status
+from app.core.caches import user_cache
 from app.db.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.services.auth_service import get_password_hash
@@ -22,19 +24,32 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 
-def get_users_by_tenant(db: Session, tenant_id: int, skip: int = 0, limit: int = 100) -> List[User]:
-    """Get users belonging to a tenant"""
-    return db.query(User).filter(User.tenant_id == tenant_id).offset(skip).limit(limit).all()
+def get_users_by_tenant(db: Session, tenant_id: int, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+    """Get users belonging to a tenant ordered by ID, starting after after_id (keyset pagination)"""
+    # Load only the columns UserResponse serializes; hashed_password never leaves the database
+    query = db.query(User).options(load_only(User.id, User.email, User.username, User.full_name, User.is_admin, User.is_superadmin, User.is_active, User.tenant_id, User.created_at, User.updated_at, raiseload=True)).filter(User.tenant_id == tenant_id)
+
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    return query.order_by(User.id).limit(limit).all()
+
+
+def ensure_username_and_email_available(db: Session, username: str, email: str) -> None:
+    """Raise a 400 if the username or email is already in use, checking both in one query"""
+    taken = db.execute(select(User.username, User.email).where(or_(User.username == username, User.email == email)).limit(2)).all()
+
+    if any(row.username == username for row in taken):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Username '{username}' already taken")
+
+    if taken:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Email '{email}' already registered")
 
 
 def create_user(db: Session, user: UserCreate) -> User:
     """Create a new user"""
     # Check if username or email already exists
-    if get_user_by_username(db, user.username):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Username '{user.username}' already taken")
-
-    if get_user_by_email(db, user.email):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Email '{user.email}' already registered")
+    ensure_username_and_email_available(db, user.username, user.email)
 
     # Hash the password
     hashed_password = get_password_hash(user.password)
@@ -66,6 +81,7 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> Optional[Us
         setattr(db_user, key, value)
 
     db.commit()
+    user_cache.pop(db_user.username)
     db.refresh(db_user)
 
     return db_user
@@ -74,11 +90,7 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> Optional[Us
 def create_superadmin(db: Session, username: str, email: str, password: str, full_name: Optional[str] = None, tenant_id: Optional[int] = None) -> User:
     """Create a superadmin user"""
     # Check if username or email already exists
-    if get_user_by_username(db, username):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Username '{username}' already taken")
-
-    if get_user_by_email(db, email):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Email '{email}' already registered")
+    ensure_username_and_email_available(db, username, email)
 
     # Hash the password
     hashed_password = get_password_hash(password)
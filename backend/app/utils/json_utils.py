@@ -3,6 +3,8 @@ import json
 from datetime import date, datetime
 from decimal import Decimal
 
+import orjson
+
 
 class CustomJSONEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles common non-serializable types"""
@@ -24,6 +26,46 @@ class CustomJSONEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-def dumps(obj, **kwargs):
-    """JSON dumps with custom encoder"""
-    return json.dumps(obj, cls=CustomJSONEncoder, **kwargs)
+# numpy scalars/arrays from the ML code and int keys (e.g. symbol IDs) are common in payloads
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _orjson_default(obj):
+    """Fallback for types orjson does not serialize natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+
+    # datetime/date subclasses (e.g. pandas Timestamp) aren't handled natively
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+
+    # Pydantic models
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, **kwargs) -> str:
+    """
+    JSON dumps with orjson (datetime/date/Decimal handled like CustomJSONEncoder).
+
+    Formatting kwargs such as indent are only supported by the stdlib encoder, so passing
+    any kwargs falls back to json.dumps with CustomJSONEncoder.
+    """
+    if kwargs:
+        return json.dumps(obj, cls=CustomJSONEncoder, **kwargs)
+    return orjson.dumps(obj, default=_orjson_default, option=ORJSON_OPTIONS).decode()
+
+
+def encode_message(obj) -> bytes:
+    """
+    Encode a WebSocket message once with orjson.
+
+    datetime/date values can be left as objects; orjson writes them in ISO format.
+    The result is UTF-8 JSON bytes, sent as a binary frame to any number of clients.
+    """
+    return orjson.dumps(obj, default=_orjson_default, option=ORJSON_OPTIONS)
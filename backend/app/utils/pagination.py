@@ -0,0 +1,32 @@
+# app/utils/pagination.py
+import base64
+from typing import Any, Optional, Sequence, Tuple
+
+import orjson
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeEncodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return tuple(values)
+
+
+def next_cursor(rows: Sequence[Any], limit: Optional[int], *key_attrs: str) -> Optional[str]:
+    """Build the cursor for the page after rows, or None if this was the last page"""
+    if not limit or len(rows) < limit:
+        return None
+
+    last = rows[-1]
+    return encode_cursor([getattr(last, attr) for attr in key_attrs])
@@ -2,42 +2,117 @@
 from fastapi import WebSocket, status
 from jose import jwt, JWTError
 import logging
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Deque
+from collections import defaultdict, deque
+import asyncio
+import hashlib
 import time
 from datetime import datetime
 
 from app.config import settings
+from app.core.caches import TTLCache
+from app.core.redis_client import get_redis_client
 from app.db.session import get_db_session
 
 logger = logging.getLogger("finexia-api")
 
-# Track connection attempts by IP
-connection_attempts = {}
 # Max 10 connection attempts per minute per IP
 MAX_CONN_ATTEMPTS = 10
 ATTEMPT_WINDOW = 60  # seconds
+# How often IPs with no attempts inside the window are dropped from the table
+ATTEMPT_SWEEP_INTERVAL = 300  # seconds
+
+# Track the most recent connection attempts by IP; older ones fall off the bounded deque
+connection_attempts: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=MAX_CONN_ATTEMPTS))
+_last_attempt_sweep = time.monotonic()
+
+# Fixed-window counter shared by all workers: INCR the per-IP key, starting its expiry on the first attempt
+RATE_LIMIT_SCRIPT = """
+local attempts = redis.call('INCR', KEYS[1])
+if attempts == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return attempts
+"""
+_rate_limit_script = None
+
+# Decoded JWT payloads keyed by a digest of the token, so reconnects skip signature verification
+JWT_CACHE_TTL = 300  # seconds, capped by the token's own expiry
+JWT_CACHE_MAX_SIZE = 10_000
+_jwt_cache = TTLCache(JWT_CACHE_MAX_SIZE, JWT_CACHE_TTL)
+
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _decode_token(token: str, cache_key: bytes) -> Dict[str, Any]:
+    """Decode and verify a JWT and cache its payload under cache_key (blocking; run off the event loop)"""
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    ttl = JWT_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _jwt_cache.set(cache_key, payload, ttl=ttl)
+
+    return payload
+
+
+def _sweep_connection_attempts(current_time: float):
+    """Forget IPs whose latest attempt is outside the window so the table cannot grow forever"""
+    global _last_attempt_sweep
+    _last_attempt_sweep = current_time
+
+    for client_ip in [ip for ip, attempts in connection_attempts.items() if not attempts or current_time - attempts[-1] >= ATTEMPT_WINDOW]:
+        del connection_attempts[client_ip]
+
+
+def _count_attempt_in_redis(client, client_ip: str) -> int:
+    """Record an attempt in Redis and return the number of attempts in the current window"""
+    global _rate_limit_script
+    if _rate_limit_script is None:
+        # register_script runs EVALSHA and reloads the script if Redis has lost it
+        _rate_limit_script = client.register_script(RATE_LIMIT_SCRIPT)
+
+    return int(_rate_limit_script(keys=[f"ws_rate_limit:{client_ip}"], args=[ATTEMPT_WINDOW]))
 
 
 async def check_rate_limit(websocket: WebSocket) -> bool:
-    """Check if client is rate limited"""
+    """
+    Check if client is rate limited.
+
+    With Redis configured the count is shared across workers and restarts; otherwise, or if Redis
+    is unreachable, attempts are tracked in this process.
+    """
     client_ip = websocket.client.host
-    current_time = time.time()
-
-    # Initialize or clean up old attempts
-    if client_ip not in connection_attempts:
-        connection_attempts[client_ip] = []
-    else:
-        # Remove attempts older than the window
-        connection_attempts[client_ip] = [t for t in connection_attempts[client_ip] if current_time - t < ATTEMPT_WINDOW]
-
-    # Check if too many attempts
-    if len(connection_attempts[client_ip]) >= MAX_CONN_ATTEMPTS:
-        logger.warning(f"Rate limit exceeded for {client_ip}")
+
+    client = get_redis_client()
+    if client is not None:
+        try:
+            # The Redis round trip runs in a worker thread so it doesn't stall the event loop
+            if await asyncio.to_thread(_count_attempt_in_redis, client, client_ip) > MAX_CONN_ATTEMPTS:
+                logger.warning("Rate limit exceeded for %s", client_ip)
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return False
+            return True
+        except Exception as e:
+            logger.warning("Redis rate limit check failed, using in-process limit: %s", e)
+
+    current_time = time.monotonic()
+
+    if current_time - _last_attempt_sweep >= ATTEMPT_SWEEP_INTERVAL:
+        _sweep_connection_attempts(current_time)
+
+    # Too many attempts if the oldest of the last MAX_CONN_ATTEMPTS is still inside the window
+    attempts = connection_attempts[client_ip]
+    if len(attempts) == MAX_CONN_ATTEMPTS and current_time - attempts[0] < ATTEMPT_WINDOW:
+        logger.warning("Rate limit exceeded for %s", client_ip)
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return False
 
     # Record this attempt
-    connection_attempts[client_ip].append(current_time)
+    attempts.append(current_time)
     return True
 
 
@@ -56,8 +131,11 @@ async def verify_token(websocket: WebSocket) -> Tuple[bool, Optional[Dict[str, A
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return False, None
 
-        # Verify token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # Verify token: a recently verified identical token is served from the cache, otherwise decode in a worker thread
+        cache_key = _token_cache_key(token)
+        payload = _jwt_cache.get(cache_key)
+        if payload is None:
+            payload = await asyncio.to_thread(_decode_token, token, cache_key)
         username = payload.get("sub")
         tenant_id = payload.get("tenant_id")
 
@@ -65,7 +143,7 @@ async def verify_token(websocket: WebSocket) -> Tuple[bool, Optional[Dict[str, A
         if "exp" in payload:
             expiration = datetime.fromtimestamp(payload["exp"])
             if datetime.utcnow() > expiration:
-                logger.warning(f"Expired token from {username}")
+                logger.warning("Expired token from %s", username)
                 await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
                 return False, None
 
@@ -83,10 +161,10 @@ async def verify_token(websocket: WebSocket) -> Tuple[bool, Optional[Dict[str, A
         return True, {"username": username, "tenant_id": tenant_id, "is_admin": payload.get("is_admin", False), "is_superadmin": payload.get("is_superadmin", False), "user_id": payload.get("user_id")}
 
     except JWTError as e:
-        logger.error(f"JWT validation error: {str(e)}")
+        logger.error("JWT validation error: %s", e)
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return False, None
     except Exception as e:
-        logger.error(f"WebSocket auth error: {str(e)}")
+        logger.error("WebSocket auth error: %s", e)
         await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
         return False, None
@@ -1,38 +1,93 @@
 # backend/app/websockets/connection_manager.py
 from fastapi import WebSocket, status
-from typing import Dict, List, Optional, Set, Any
+from typing import Dict, Iterable, List, Optional, Set, Any, Tuple, Union
 import logging
 import json
 import asyncio
 from datetime import datetime
-from app.utils.json_utils import dumps
+from app.utils.json_utils import encode_message
+from app.websockets.message import OutgoingMessage
 import time
+import zlib
+from collections import Counter
+from functools import lru_cache
 
 logger = logging.getLogger("finexia-api")
 
+# Frames buffered per client before it is considered too slow and dropped
+OUTBOUND_QUEUE_SIZE = 256
+# Most queued messages coalesced into one {"type": "batch", "items": [...]} frame
+BROADCAST_BATCH_SIZE = 50
+
+# Most WebSocket closes (stale or slow clients) in flight at once
+CLOSE_CONCURRENCY = 256
+
+# Single-message frames at least this large are zlib-compressed and sent behind a COMPRESSED_FRAME_FLAG byte
+# (plain frames are JSON and always start with "{")
+COMPRESS_MIN_SIZE = 512
+COMPRESSED_FRAME_FLAG = b"\x01"
+
+# Pre-encoded heartbeat frame; only the timestamp changes between rounds
+HEARTBEAT_TEMPLATE = b'{"type":"heartbeat","timestamp":"%s"}'
+
+# Placeholders encoded into the welcome frame, turned into %s slots for the timestamp and client ID
+_WELCOME_TIMESTAMP = b'"\\u0000timestamp"'
+_WELCOME_CLIENT_ID = b'"\\u0000client_id"'
+
+
+@lru_cache(maxsize=64)
+def _compressed(payload: bytes) -> bytes:
+    """Compressed frame for a payload; cached so all recipients of a broadcast share one compression"""
+    return COMPRESSED_FRAME_FLAG + zlib.compress(payload, 1)
+
+
+def compress_frame(payload: bytes) -> bytes:
+    """Frame for a single encoded message: compressed if it is at least COMPRESS_MIN_SIZE, else the payload as-is"""
+    return _compressed(payload) if len(payload) >= COMPRESS_MIN_SIZE else payload
+
+
+@lru_cache(maxsize=1024)
+def _welcome_template(topic: str) -> bytes:
+    """Encoded welcome frame for a topic as a printf-style template taking the timestamp and client ID (both quoted)"""
+    encoded = encode_message({"type": "connected", "timestamp": "\0timestamp", "data": {"message": f"Connected to {topic}", "client_id": "\0client_id"}})
+    return encoded.replace(b"%", b"%%").replace(_WELCOME_TIMESTAMP, b"%s", 1).replace(_WELCOME_CLIENT_ID, b"%s", 1)
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        # Insertion-ordered dicts used as sets for O(1) removal; broadcasts iterate a tuple snapshot built lazily after each change
+        self.active_connections: Dict[str, Dict[WebSocket, None]] = {}
+        self._topic_snapshots: Dict[str, Tuple[WebSocket, ...]] = {}
         self.tenant_connections: Dict[int, Set[WebSocket]] = {}
-        self.connection_info: Dict[WebSocket, Dict] = {}
-        self.last_heartbeat = {}  # Track last heartbeat time by client
+        # Per-connection attributes, one dict per attribute keyed by WebSocket, so scans only touch what they need
+        self.client_ids: Dict[WebSocket, str] = {}
+        self.connection_topics: Dict[WebSocket, str] = {}
+        self.connection_tenants: Dict[WebSocket, Optional[int]] = {}
+        self.connection_users: Dict[WebSocket, Optional[int]] = {}
+        self.connected_at: Dict[WebSocket, datetime] = {}
+        self.outbound_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.writers: Dict[WebSocket, asyncio.Task] = {}
+        self.last_heartbeat: Dict[WebSocket, float] = {}  # Track last heartbeat time (monotonic) by connection
         self._heartbeat_task = None
 
         # Connection statistics
-        self.connection_stats = {"total_connections": 0, "connections_by_topic": {}, "connections_by_tenant": {}, "max_concurrent": 0, "total_messages_sent": 0, "total_messages_received": 0}
+        self.connection_stats = {"total_connections": 0, "connections_by_topic": Counter(), "connections_by_tenant": Counter(), "max_concurrent": 0, "total_messages_sent": 0, "total_messages_received": 0}
 
     async def connect(self, websocket: WebSocket, client_id: str, topic: str, tenant_id: Optional[int] = None, user_id: Optional[int] = None):
         """Connect a client to a specific topic"""
         await websocket.accept()
 
-        # Initialize topic if doesn't exist
-        if topic not in self.active_connections:
-            self.active_connections[topic] = []
-
-        # Store connection with metadata
-        self.active_connections[topic].append(websocket)
-        self.connection_info[websocket] = {"client_id": client_id, "topic": topic, "tenant_id": tenant_id, "user_id": user_id, "connected_at": datetime.now()}
+        # Store connection with metadata; each client gets its own outbound queue drained by a writer task
+        outq = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+        self.active_connections.setdefault(topic, {})[websocket] = None
+        self._topic_snapshots.pop(topic, None)
+        self.client_ids[websocket] = client_id
+        self.connection_topics[websocket] = topic
+        self.connection_tenants[websocket] = tenant_id
+        self.connection_users[websocket] = user_id
+        self.connected_at[websocket] = datetime.now()
+        self.outbound_queues[websocket] = outq
+        self.writers[websocket] = asyncio.create_task(self._writer(websocket, outq))
 
         # Track by tenant for tenant-specific broadcasts
         if tenant_id:
@@ -41,206 +96,225 @@ class ConnectionManager:
             self.tenant_connections[tenant_id].add(websocket)
 
         # Track last heartbeat
-        self.last_heartbeat[client_id] = time.time()
+        self.last_heartbeat[websocket] = time.monotonic()
 
         # Update stats
         self.connection_stats["total_connections"] += 1
-        current_connections = len(self.connection_info)
+        current_connections = len(self.client_ids)
         if current_connections > self.connection_stats["max_concurrent"]:
             self.connection_stats["max_concurrent"] = current_connections
 
-        # Update topic stats
-        if topic not in self.connection_stats["connections_by_topic"]:
-            self.connection_stats["connections_by_topic"][topic] = 0
+        # Update topic and tenant stats
         self.connection_stats["connections_by_topic"][topic] += 1
-
-        # Update tenant stats
         if tenant_id:
-            tenant_key = str(tenant_id)
-            if tenant_key not in self.connection_stats["connections_by_tenant"]:
-                self.connection_stats["connections_by_tenant"][tenant_key] = 0
-            self.connection_stats["connections_by_tenant"][tenant_key] += 1
+            self.connection_stats["connections_by_tenant"][str(tenant_id)] += 1
 
-        logger.info(f"Client {client_id} connected to {topic}. Total connections: {self.connection_count}")
+        logger.info("Client %s connected to %s. Total connections: %d", client_id, topic, self.connection_count)
 
         # Send welcome message
-        await websocket.send_json({"type": "connected", "timestamp": datetime.now().isoformat(), "data": {"message": f"Connected to {topic}", "client_id": client_id}})
+        # The ISO timestamp is plain ASCII; the client ID contains the username, so it still goes through the encoder for escaping
+        welcome = _welcome_template(topic) % (b'"%s"' % datetime.now().isoformat().encode(), encode_message(client_id))
+        self._enqueue([websocket], welcome)
 
     def disconnect(self, websocket: WebSocket):
         """Disconnect a client from all topics"""
-        if websocket not in self.connection_info:
+        if websocket not in self.client_ids:
             return
 
-        # Get connection info before removing
-        client_info = self.connection_info[websocket]
-        topic = client_info["topic"]
-        tenant_id = client_info["tenant_id"]
-        client_id = client_info["client_id"]
+        # Remove connection info
+        client_id = self.client_ids.pop(websocket)
+        topic = self.connection_topics.pop(websocket)
+        tenant_id = self.connection_tenants.pop(websocket)
+        del self.connection_users[websocket], self.connected_at[websocket], self.outbound_queues[websocket]
+        writer = self.writers.pop(websocket)
 
-        # Remove from topic
+        # Remove from topic (empty topics and tenants are dropped, so the stats can report these indexes as-is)
         if topic in self.active_connections:
-            if websocket in self.active_connections[topic]:
-                self.active_connections[topic].remove(websocket)
+            self.active_connections[topic].pop(websocket, None)
+            self._topic_snapshots.pop(topic, None)
+            if not self.active_connections[topic]:
+                del self.active_connections[topic]
 
         # Remove from tenant tracking
         if tenant_id in self.tenant_connections:
-            if websocket in self.tenant_connections[tenant_id]:
-                self.tenant_connections[tenant_id].remove(websocket)
+            self.tenant_connections[tenant_id].discard(websocket)
+            if not self.tenant_connections[tenant_id]:
+                del self.tenant_connections[tenant_id]
 
         # Remove from heartbeat tracking
-        if client_id in self.last_heartbeat:
-            del self.last_heartbeat[client_id]
+        self.last_heartbeat.pop(websocket, None)
 
-        # Remove connection info
-        if websocket in self.connection_info:
-            del self.connection_info[websocket]
+        # Stop the writer (unless it is the one disconnecting us)
+        if writer is not asyncio.current_task():
+            writer.cancel()
 
-        logger.info(f"Client {client_id} disconnected from {topic}. Total connections: {self.connection_count}")
+        logger.info("Client %s disconnected from %s. Total connections: %d", client_id, topic, self.connection_count)
 
-    async def broadcast(self, message: Dict, topic: str):
-        """Broadcast a message to all connections in a topic"""
-        if topic not in self.active_connections:
-            return
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        Drain a client's outbound queue; drops the client on failure.
 
-        disconnected = []
-        sent_count = 0
+        Whatever has piled up behind the first message (up to BROADCAST_BATCH_SIZE) is sent with it
+        as a single batch frame, so bursts cost one frame instead of many while a quiet stream still
+        goes out one message per frame.
+        """
+        while True:
+            items = [await queue.get()]
+            while len(items) < BROADCAST_BATCH_SIZE and not queue.empty():
+                items.append(queue.get_nowait())
 
-        for connection in self.active_connections[topic]:
+            # Items are already-encoded JSON objects, so the batch envelope is built by joining bytes
+            frame = compress_frame(items[0][0]) if len(items) == 1 else b'{"type":"batch","items":[' + b",".join(payload for payload, _ in items) + b"]}"
             try:
-                # Use custom JSON serialization
-                json_str = dumps(message)
-                await connection.send_text(json_str)
-                sent_count += 1
+                await websocket.send_bytes(frame)
             except Exception as e:
-                logger.error(f"Error sending to client: {str(e)}")
-                disconnected.append(connection)
+                logger.debug("Error sending to client: %s", e)
+                self.disconnect(websocket)
+                return
 
-        # Update message count
-        self.connection_stats["total_messages_sent"] += sent_count
+            self.connection_stats["total_messages_sent"] += sum(count_sent for _, count_sent in items)
 
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+    def _enqueue(self, connections: Iterable[WebSocket], payload: bytes, count_sent: bool = True) -> List[WebSocket]:
+        """
+        Queue a pre-serialized payload on each connection's writer without awaiting any sends.
 
-    async def broadcast_to_tenant(self, message: Dict, tenant_id: int):
-        """Broadcast a message to all connections for a specific tenant"""
-        if tenant_id not in self.tenant_connections:
-            return
+        A slow client only fills its own queue instead of holding up everyone else.
+        Returns the connections whose queue was full.
+        """
+        overflowed = []
+        # Hoisted out of the loop: every queue gets the same item, and the lookup is bound once
+        item = (payload, count_sent)
+        get_queue = self.outbound_queues.get
 
-        disconnected = []
-        sent_count = 0
+        for connection in connections:
+            queue = get_queue(connection)
+            if queue is None:
+                continue
 
-        for connection in self.tenant_connections[tenant_id]:
             try:
-                await connection.send_json(message)
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"Error sending to tenant {tenant_id}: {str(e)}")
-                disconnected.append(connection)
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                overflowed.append(connection)
 
-        # Update message count
-        self.connection_stats["total_messages_sent"] += sent_count
+        return overflowed
 
-        # Clean up disconnected clients
-        for connection in disconnected:
+    async def _close_all(self, connections: List[WebSocket], code: int, reason: str):
+        """Close connections concurrently, at most CLOSE_CONCURRENCY at a time, ignoring failures"""
+        if not connections:
+            return
+
+        semaphore = asyncio.Semaphore(CLOSE_CONCURRENCY)
+
+        async def close(connection: WebSocket):
+            async with semaphore:
+                try:
+                    await connection.close(code=code, reason=reason)
+                except Exception:
+                    pass
+
+        await asyncio.gather(*(close(connection) for connection in connections))
+
+    async def _drop_slow_clients(self, connections: List[WebSocket]):
+        """Disconnect and close clients that could not keep up with their outbound queue"""
+        for connection in connections:
+            logger.warning("Outbound queue full for client %s, disconnecting", self.client_ids.get(connection))
             self.disconnect(connection)
+        await self._close_all(connections, status.WS_1008_POLICY_VIOLATION, "Client too slow")
 
-    async def send_personal_message(self, message: Dict, websocket: WebSocket):
-        """Send a message to a specific client"""
-        try:
-            # Use custom JSON serialization
-            json_str = dumps(message)
-            await websocket.send_text(json_str)
-            self.connection_stats["total_messages_sent"] += 1
-        except Exception as e:
-            logger.error(f"Error sending personal message: {str(e)}")
-            self.disconnect(websocket)
+    async def broadcast(self, message: Union[Dict, bytes], topic: str):
+        """Broadcast a message (dict, or a payload already encoded with encode_message) to all connections in a topic"""
+        if topic not in self.active_connections:
+            return
+
+        connections = self._topic_snapshots.get(topic)
+        if connections is None:
+            connections = self._topic_snapshots[topic] = tuple(self.active_connections[topic])
+
+        # Serialize once and hand the same bytes to every client's writer
+        payload = message if isinstance(message, bytes) else encode_message(message)
+        await self._drop_slow_clients(self._enqueue(connections, payload))
+
+    async def broadcast_to_tenant(self, message: Union[Dict, bytes], tenant_id: int):
+        """Broadcast a message (dict, or a payload already encoded with encode_message) to all connections for a specific tenant"""
+        if tenant_id not in self.tenant_connections:
+            return
+
+        payload = message if isinstance(message, bytes) else encode_message(message)
+        await self._drop_slow_clients(self._enqueue(list(self.tenant_connections[tenant_id]), payload))
+
+    async def send_personal_message(self, message: OutgoingMessage, websocket: WebSocket):
+        """Send a message (dict, Envelope, or a payload already encoded with encode_message) to a specific client"""
+        payload = message if isinstance(message, bytes) else encode_message(message)
+        await self._drop_slow_clients(self._enqueue([websocket], payload))
 
     async def start_heartbeat_monitor(self):
         """Start the heartbeat monitoring task"""
         if self._heartbeat_task is None:
             self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
 
+    async def stop_heartbeat_monitor(self):
+        """Stop the heartbeat monitoring task"""
+        if self._heartbeat_task is None:
+            return
+
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+
     async def _heartbeat_loop(self):
         """Periodically check for stale connections"""
         while True:
             try:
-                current_time = time.time()
+                current_time = time.monotonic()
                 stale_connections = []
+                live_connections = []
 
-                # Check for connections without heartbeats in last 30 seconds
-                for ws, info in self.connection_info.items():
-                    client_id = info.get("client_id")
-                    if client_id in self.last_heartbeat:
-                        last_beat = self.last_heartbeat[client_id]
-                        if current_time - last_beat > 30:  # 30 seconds timeout
-                            stale_connections.append(ws)
-                            logger.warning(f"Client {client_id} connection stale, disconnecting")
+                # One pass: connections without heartbeats in last 30 seconds are closed, the rest get a heartbeat
+                for ws, last_beat in self.last_heartbeat.items():
+                    if current_time - last_beat > 30:  # 30 seconds timeout
+                        stale_connections.append(ws)
+                        logger.warning("Client %s connection stale, disconnecting", self.client_ids.get(ws))
+                    else:
+                        live_connections.append(ws)
 
-                # Disconnect stale connections
+                # Disconnect stale connections, closing them concurrently
                 for ws in stale_connections:
-                    await ws.close(code=1001, reason="Connection timeout")
                     self.disconnect(ws)
+                await self._close_all(stale_connections, 1001, "Connection timeout")
 
-                # Send heartbeat to all connections
-                heartbeat_msg = {"type": "heartbeat", "timestamp": datetime.now().isoformat()}
-                for topic, connections in self.active_connections.items():
-                    for ws in connections:
-                        try:
-                            await ws.send_json(heartbeat_msg)
-                        except Exception as e:
-                            logger.debug(f"Error sending heartbeat: {e}")
-                            self.disconnect(ws)
+                # Queue the heartbeat for the live connections, encoded once per round (not counted as messages sent)
+                heartbeat_msg = HEARTBEAT_TEMPLATE % datetime.now().isoformat().encode()
+                await self._drop_slow_clients(self._enqueue(live_connections, heartbeat_msg, count_sent=False))
 
                 await asyncio.sleep(15)  # Check every 15 seconds
             except Exception as e:
-                logger.error(f"Error in heartbeat loop: {e}")
+                logger.error("Error in heartbeat loop: %s", e)
                 await asyncio.sleep(5)  # Retry after 5 seconds on error
 
     async def record_heartbeat(self, websocket: WebSocket):
         """Record a heartbeat from a client"""
-        client_info = self.connection_info.get(websocket)
-        if client_info:
-            client_id = client_info.get("client_id")
-            if client_id:
-                self.last_heartbeat[client_id] = time.time()
+        if websocket in self.last_heartbeat:
+            self.last_heartbeat[websocket] = time.monotonic()
 
     def get_detailed_stats(self) -> Dict[str, Any]:
         """Get detailed connection statistics"""
-        active_count = len(self.connection_info)
-        stats = {"active_connections": active_count, "connections_by_topic": {}, "connections_by_tenant": {}, "historical": {"total_connections": self.connection_stats["total_connections"], "max_concurrent": self.connection_stats["max_concurrent"], "total_messages_sent": self.connection_stats["total_messages_sent"], "total_messages_received": self.connection_stats["total_messages_received"]}}
-
-        # Count current connections by topic
-        for ws, info in self.connection_info.items():
-            topic = info.get("topic")
-            tenant_id = info.get("tenant_id")
-
-            if topic:
-                if topic not in stats["connections_by_topic"]:
-                    stats["connections_by_topic"][topic] = 0
-                stats["connections_by_topic"][topic] += 1
-
-            if tenant_id:
-                tenant_key = str(tenant_id)
-                if tenant_key not in stats["connections_by_tenant"]:
-                    stats["connections_by_tenant"][tenant_key] = 0
-                stats["connections_by_tenant"][tenant_key] += 1
+        active_count = len(self.client_ids)
+        stats = {"active_connections": active_count, "connections_by_topic": {topic: len(conns) for topic, conns in self.active_connections.items()}, "connections_by_tenant": {str(tenant_id): len(conns) for tenant_id, conns in self.tenant_connections.items()}, "historical": {"total_connections": self.connection_stats["total_connections"], "max_concurrent": self.connection_stats["max_concurrent"], "total_messages_sent": self.connection_stats["total_messages_sent"], "total_messages_received": self.connection_stats["total_messages_received"]}}
 
         return stats
 
     @property
     def connection_count(self) -> int:
         """Get total number of active connections"""
-        return len(self.connection_info)
+        return len(self.client_ids)
 
     def get_stats(self) -> Dict:
         """Get connection statistics"""
         # Count by tenant
-        tenant_counts = {}
-        for conn, info in self.connection_info.items():
-            tenant_id = info.get("tenant_id")
-            if tenant_id:
-                tenant_counts[tenant_id] = tenant_counts.get(tenant_id, 0) + 1
+        tenant_counts = {tenant_id: len(conns) for tenant_id, conns in self.tenant_connections.items()}
 
         # Count by topic
         topic_counts = {topic: len(conns) for topic, conns in self.active_connections.items()}
@@ -1,11 +1,15 @@
 # backend/app/websockets/message.py
 
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 import uuid
 
+from app.utils.json_utils import encode_message
+
 
 class MessageType(str, Enum):
     """Standard message types for WebSocket communication"""
@@ -31,14 +35,42 @@ class WebSocketMessage(BaseModel):
     data: Dict[str, Any]
 
 
-def create_message(message_type: MessageType, topic: str, data: Dict[str, Any], tenant_id: Optional[int] = None) -> Dict[str, Any]:
-    """Create a standardized WebSocket message"""
-    msg = WebSocketMessage(
-        type=message_type,
-        # Use string rather than datetime object directly
-        timestamp=datetime.now().isoformat(),
-        topic=topic,
-        data=data,
-        tenant_id=tenant_id,
-    )
-    return msg.dict()
+@dataclass
+class Envelope:
+    """Outgoing WebSocketMessage; slotted, and encoded by orjson natively as a dataclass (fields in this order)"""
+
+    __slots__ = ("type", "timestamp", "message_id", "tenant_id", "topic", "data")
+
+    type: str
+    timestamp: datetime
+    message_id: str
+    tenant_id: Optional[int]
+    topic: str
+    data: Dict[str, Any]
+
+
+# Anything the send helpers accept: a message dict, an Envelope, or an already encoded message
+OutgoingMessage = Union[Dict[str, Any], Envelope, bytes]
+
+
+def create_message(message_type: MessageType, topic: str, data: Dict[str, Any], tenant_id: Optional[int] = None) -> Envelope:
+    """Create a standardized WebSocket message (same shape as WebSocketMessage, without model validation)"""
+    # orjson writes the datetime in ISO format when the message is encoded
+    return Envelope(message_type.value, datetime.now(), uuid.uuid4().hex, tenant_id, topic, data)
+
+
+# Placeholders encoded into message templates, turned into %s slots for the timestamp and message ID
+_TEMPLATE_TIMESTAMP = b'"\\u0000timestamp"'
+_TEMPLATE_MESSAGE_ID = b'"\\u0000message_id"'
+
+
+@lru_cache(maxsize=1024)
+def _message_template(message_type: MessageType, topic: str, tenant_id: Optional[int], data_items: tuple) -> bytes:
+    """Encoded create_message output as a printf-style template taking the timestamp and message ID"""
+    encoded = encode_message({"type": message_type.value, "timestamp": "\0timestamp", "message_id": "\0message_id", "tenant_id": tenant_id, "topic": topic, "data": dict(data_items)})
+    return encoded.replace(b"%", b"%%").replace(_TEMPLATE_TIMESTAMP, b'"%s"', 1).replace(_TEMPLATE_MESSAGE_ID, b'"%s"', 1)
+
+
+def encode_static_message(message_type: MessageType, topic: str, data: Dict[str, Any], tenant_id: Optional[int] = None) -> bytes:
+    """Encoded equivalent of create_message for constant data (welcome, ping), filled into a cached template"""
+    return _message_template(message_type, topic, tenant_id, tuple(data.items())) % (datetime.now().isoformat().encode(), uuid.uuid4().hex.encode())
@@ -1,6 +1,29 @@
 // src/services/websocket.js
 import { useAuthStore } from '@/stores/auth'
 
+// Server messages arrive as binary frames of UTF-8 JSON
+const textDecoder = new TextDecoder()
+
+// Heartbeat replies go out as a binary frame the server can match without decoding
+const HEARTBEAT_FRAME = new TextEncoder().encode('heartbeat')
+
+// Large messages are zlib-compressed and prefixed with this byte (plain JSON frames start with '{')
+const COMPRESSED_FRAME_FLAG = 0x01
+
+async function decodeFrame(data) {
+  if (typeof data === 'string') {
+    return data
+  }
+
+  const bytes = new Uint8Array(data)
+  if (bytes[0] !== COMPRESSED_FRAME_FLAG) {
+    return textDecoder.decode(bytes)
+  }
+
+  const stream = new Blob([bytes.subarray(1)]).stream().pipeThrough(new DecompressionStream('deflate'))
+  return new Response(stream).text()
+}
+
 class WebSocketService {
   constructor() {
     this.connections = {}
@@ -36,6 +59,7 @@ class WebSocketService {
 
     // Create WebSocket connection
     this.connections[connectionKey] = new WebSocket(wsUrl)
+    this.connections[connectionKey].binaryType = 'arraybuffer'
     this.connectionStatus[connectionKey] = 'connecting'
 
     // Set up event handlers
@@ -45,18 +69,10 @@ class WebSocketService {
       this._notifyListeners(connectionKey, 'connection', { status: 'connected' })
     }
 
+    // Decompression is async, so frames are handled through a chain to keep them in order
+    let pendingFrames = Promise.resolve()
     this.connections[connectionKey].onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data)
-        this._notifyListeners(connectionKey, data.type, data)
-
-        // Handle heartbeats
-        if (data.type === 'heartbeat') {
-          this.connections[connectionKey].send('heartbeat')
-        }
-      } catch (error) {
-        console.error('Error parsing WebSocket message:', error)
-      }
+      pendingFrames = pendingFrames.then(() => this._handleFrame(connectionKey, event.data))
     }
 
     this.connections[connectionKey].onclose = () => {
@@ -115,6 +131,25 @@ class WebSocketService {
     return true
   }
 
+  async _handleFrame(connectionKey, frame) {
+    try {
+      const data = JSON.parse(await decodeFrame(frame))
+
+      // Bursts arrive coalesced into one batch frame
+      const messages = data.type === 'batch' ? data.items : [data]
+      for (const message of messages) {
+        this._notifyListeners(connectionKey, message.type, message)
+
+        // Handle heartbeats
+        if (message.type === 'heartbeat' && this.connections[connectionKey]) {
+          this.connections[connectionKey].send(HEARTBEAT_FRAME)
+        }
+      }
+    } catch (error) {
+      console.error('Error parsing WebSocket message:', error)
+    }
+  }
+
   _notifyListeners(connectionKey, eventType, data) {
     if (!this.listeners[connectionKey] || !this.listeners[connectionKey][eventType]) {
       return